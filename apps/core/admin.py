@@ -17,10 +17,6 @@ class EventTypeAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     ordering = ['order', 'name']
 
-    def product_count(self, obj):
-        return obj.products.count()
-    product_count.short_description = 'Products'
-
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -31,10 +27,6 @@ class CategoryAdmin(admin.ModelAdmin):
     filter_horizontal = ['event_types']
     ordering = ['order', 'name']
 
-    def product_count(self, obj):
-        return obj.products.count()
-    product_count.short_description = 'Products'
-
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -4,5 +4,6 @@ from . import api_views
 urlpatterns = [
     path('search/', api_views.SearchAPIView.as_view(), name='api_search'),
     path('products/', api_views.ProductListAPIView.as_view(), name='api_products'),
+    path('products/<int:pk>/availability/', api_views.ProductAvailabilityAPIView.as_view(), name='api_product_availability'),
 ]
 
@@ -1,7 +1,16 @@
+import hashlib
+from datetime import datetime, timedelta
 from django.http import JsonResponse
 from django.views import View
-from django.db.models import Q
-from .models import Product
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import quote_etag
+from .cache import get_version
+from .facets import parse_price
+from .models import Product, RentalAvailability
+from .pagination import KeysetPaginator
+from .typeahead import typeahead_index
 
 
 class SearchAPIView(View):
@@ -12,45 +21,122 @@ class SearchAPIView(View):
         results = []
         
         if query and len(query) >= 2:
-            products = Product.objects.filter(
-                Q(name__icontains=query) | Q(description__icontains=query),
-                is_active=True
-            ).select_related('category').prefetch_related('images')[:10]
-            
-            for product in products:
-                image = product.primary_image
-                results.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'price': str(product.current_price),
-                    'url': product.get_absolute_url(),
-                    'image': image.image.url if image and image.image else '/static/images/placeholder.svg',
-                    'category': product.category.name,
-                })
+            # Answered from the in-process typeahead index, no database query
+            results = typeahead_index.search(query, limit=10)
         
         return JsonResponse({'results': results})
 
 
 class ProductListAPIView(View):
-    """API endpoint for products."""
+    """
+    API endpoint for products, paginated with ?cursor= (the next_cursor of
+    the previous response), sorted with ?sort= and filtered on the effective
+    price with ?min_price= and ?max_price= (inclusive).
+    """
+    per_page = 20
+    orderings = {
+        '-created_at': ['-created_at'],
+        'price': ['effective_price'],
+        '-price': ['-effective_price'],
+        'name': ['name'],
+        '-name': ['-name'],
+    }
     
     def get(self, request):
-        products = Product.objects.filter(is_active=True).select_related('category').prefetch_related('images')[:20]
+        ordering = self.orderings.get(request.GET.get('sort'), self.orderings['-created_at'])
+        products = Product.objects.listed()
+        min_price = parse_price(request.GET.get('min_price'))
+        max_price = parse_price(request.GET.get('max_price'))
+        if min_price is not None:
+            products = products.filter(effective_price__gte=min_price)
+        if max_price is not None:
+            products = products.filter(effective_price__lte=max_price)
+        paginator = KeysetPaginator(
+            products,
+            self.per_page,
+            ordering=ordering
+        )
+        page = paginator.page(request.GET.get('cursor'))
         
         results = []
-        for product in products:
-            image = product.primary_image
+        for product in page:
             results.append({
                 'id': product.id,
                 'name': product.name,
                 'slug': product.slug,
                 'price': str(product.price),
                 'sale_price': str(product.sale_price) if product.sale_price else None,
+                'current_price': str(product.effective_price),
                 'url': product.get_absolute_url(),
-                'image': image.image.url if image and image.image else '/static/images/placeholder.svg',
+                'image': product.primary_image_url or '/static/images/placeholder.svg',
                 'category': product.category.name,
                 'in_stock': product.in_stock,
             })
         
-        return JsonResponse({'products': results})
+        return JsonResponse({
+            'products': results,
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        })
+
 
+class ProductAvailabilityAPIView(View):
+    """
+    API endpoint for the rental availability calendar of a product.
+    Returns the available quantity per day for one to three months,
+    starting at ?month=YYYY-MM (default: the current month).
+    """
+    max_months = 3
+    
+    def get(self, request, pk):
+        product = get_object_or_404(Product, pk=pk, is_active=True)
+        if not product.is_rental:
+            return JsonResponse({'error': 'This product is for sale only, not rental'}, status=400)
+        
+        try:
+            first_day = datetime.strptime(request.GET['month'], '%Y-%m').date()
+        except (KeyError, ValueError):
+            first_day = timezone.localdate().replace(day=1)
+        try:
+            months = min(max(int(request.GET.get('months', 1)), 1), self.max_months)
+        except ValueError:
+            months = 1
+        
+        next_month = first_day
+        for _ in range(months):
+            next_month = (next_month + timedelta(days=32)).replace(day=1)
+        last_day = next_month - timedelta(days=1)
+        min_date = product.get_min_rental_date()
+        max_date = product.get_max_rental_date()
+        
+        # The ETag changes with the product, its reservations and the booking window
+        etag = quote_etag(hashlib.md5(':'.join(str(part) for part in [
+            product.pk, product.updated_at.timestamp(), product.stock,
+            get_version(RentalAvailability.version_key(product.pk)),
+            min_date, first_day, months,
+        ]).encode()).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            reserved = dict(RentalAvailability.objects.filter(
+                product=product,
+                day__range=(first_day, last_day)
+            ).values_list('day', 'reserved'))
+            
+            days = []
+            for day in RentalAvailability.days_between(first_day, last_day):
+                bookable = day >= min_date and (max_date is None or day <= max_date)
+                days.append({
+                    'date': day.isoformat(),
+                    'available': max(0, product.stock - reserved.get(day, 0)) if bookable else 0,
+                })
+            
+            response = JsonResponse({
+                'product': product.id,
+                'min_date': min_date.isoformat(),
+                'max_date': max_date.isoformat() if max_date else None,
+                'days': days,
+            })
+            response['ETag'] = etag
+        
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        return response
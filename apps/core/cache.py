@@ -0,0 +1,76 @@
+"""
+Shared cache helpers for VerzendConnect.
+"""
+import copy
+import threading
+import time
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+
+# Seconds a worker trusts its in-process singleton copies before checking
+# the shared version key again; bounds how stale a copy can get
+SINGLETON_CHECK_INTERVAL = 5
+
+# Version key of the navigation tree built by the site_settings context processor
+NAVIGATION_VERSION_KEY = 'navigation-version'
+
+# Version key bumped whenever a product, its images or a category changes
+CATALOGUE_VERSION_KEY = 'catalogue-version'
+
+_singletons = {}
+_singletons_lock = threading.Lock()
+
+
+def get_version(key):
+    """Get the current version token stored under key, creating one if missing."""
+    version = cache.get(key)
+    if version is None:
+        # add() keeps a token another worker stored in the meantime
+        cache.add(key, uuid.uuid4().hex[:12], None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Store a new version token under key, invalidating everything derived from it."""
+    cache.set(key, uuid.uuid4().hex[:12], None)
+
+
+def _singleton_key(model):
+    return f'singleton-version:{model._meta.label_lower}'
+
+
+def get_singleton(model, loader):
+    """
+    Return a copy of the singleton instance of model, held in process memory.
+    loader() fetches it from the database on a miss. The shared version key
+    is checked at most every SINGLETON_CHECK_INTERVAL seconds, so a change
+    made by another worker is picked up within that window.
+    """
+    key = _singleton_key(model)
+    now = time.monotonic()
+    entry = _singletons.get(key)
+    if entry is None or entry['checked'] + SINGLETON_CHECK_INTERVAL <= now:
+        version = get_version(key)
+        if entry is None or entry['version'] != version:
+            entry = {'version': version, 'obj': loader(), 'checked': now}
+        else:
+            entry = dict(entry, checked=now)
+        with _singletons_lock:
+            _singletons[key] = entry
+    # Callers may modify what they get (forms do); keep the cached copy clean
+    return copy.copy(entry['obj'])
+
+
+def singleton_changed(model):
+    """Drop the process copy of model's singleton and invalidate it in all workers."""
+    key = _singleton_key(model)
+    with _singletons_lock:
+        _singletons.pop(key, None)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+def catalogue_changed():
+    """Invalidate everything derived from the catalogue once the transaction commits."""
+    transaction.on_commit(lambda: bump_version(CATALOGUE_VERSION_KEY))
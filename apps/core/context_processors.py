@@ -1,15 +1,61 @@
+from django.core.cache import cache
+from django.utils import translation
+from .cache import get_version, NAVIGATION_VERSION_KEY
 from .models import SiteSettings, Category, EventType
 
+NAVIGATION_TIMEOUT = 60 * 60 * 24
+
+
+def get_navigation():
+    """
+    Navigation tree (names, slugs and URLs of the active categories, nested
+    under their parents to any depth, and active event types) for the current
+    language. Cached in the shared cache until a Category or EventType changes.
+    """
+    key = f'navigation:{get_version(NAVIGATION_VERSION_KEY)}:{translation.get_language()}'
+    navigation = cache.get(key)
+    if navigation is None:
+        # The whole tree in one query; parents sort before their children by depth
+        nodes = {}
+        roots = []
+        for category in Category.objects.filter(is_active=True).order_by('depth', 'order', 'name'):
+            node = {
+                'name': category.name,
+                'slug': category.slug,
+                'url': category.get_absolute_url(),
+                'subcategories': [],
+            }
+            if category.parent_id is None:
+                roots.append(node)
+            elif category.parent_id in nodes:
+                nodes[category.parent_id]['subcategories'].append(node)
+            else:
+                # Below an inactive category
+                continue
+            nodes[category.id] = node
+        navigation = {
+            'categories': roots,
+            'event_types': [
+                {
+                    'name': event_type.name,
+                    'slug': event_type.slug,
+                    'icon': event_type.icon,
+                    'url': event_type.get_absolute_url(),
+                }
+                for event_type in EventType.objects.filter(is_active=True)
+            ],
+        }
+        cache.set(key, navigation, NAVIGATION_TIMEOUT)
+    return navigation
+
 
 def site_settings(request):
     """Add site settings and navigation data to all templates."""
     settings = SiteSettings.get_settings()
-    categories = Category.objects.filter(is_active=True, parent__isnull=True).prefetch_related('subcategories')
-    event_types = EventType.objects.filter(is_active=True)
+    navigation = get_navigation()
     
     return {
         'site_settings': settings,
-        'nav_categories': categories,
-        'nav_event_types': event_types,
+        'nav_categories': navigation['categories'],
+        'nav_event_types': navigation['event_types'],
     }
-
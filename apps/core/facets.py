@@ -0,0 +1,99 @@
+"""
+Facet counts for the product catalogue filters.
+
+Each facet is counted with one grouped aggregate over the products matching
+every other active filter, so picking a value in one facet still shows the
+alternatives in that facet. Results are cached per filter signature until
+the catalogue changes.
+"""
+import hashlib
+from decimal import Decimal, InvalidOperation
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+from .cache import get_version, CATALOGUE_VERSION_KEY
+from .models import Category
+
+FACETS_TIMEOUT = 60 * 15
+
+# [min, max) effective price per band; None means unbounded
+PRICE_BANDS = [
+    (None, 25),
+    (25, 50),
+    (50, 100),
+    (100, 250),
+    (250, None),
+]
+
+
+def parse_price(value):
+    """A non-negative price from a query string value, or None."""
+    try:
+        price = Decimal(value)
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+    return price if price.is_finite() and price >= 0 else None
+
+
+def _grouped_counts(queryset, field):
+    """{value: number of distinct products} for one grouped aggregate."""
+    rows = queryset.order_by().values_list(field).annotate(count=Count('pk', distinct=True))
+    return {value: count for value, count in rows if value is not None}
+
+
+def _roll_up(direct_counts):
+    """Add the product counts of subcategories to all their ancestors."""
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    counts = {}
+    for category_id, count in direct_counts.items():
+        seen = set()
+        while category_id is not None and category_id not in seen:
+            seen.add(category_id)
+            counts[category_id] = counts.get(category_id, 0) + count
+            category_id = parents.get(category_id)
+    return counts
+
+
+def _price_band_counts(queryset):
+    whens = []
+    for band, (low, high) in enumerate(PRICE_BANDS):
+        if high is not None:
+            whens.append(When(effective_price__lt=high, then=Value(band)))
+    band_counts = _grouped_counts(
+        queryset.annotate(price_band=Case(
+            *whens, default=Value(len(PRICE_BANDS) - 1), output_field=IntegerField()
+        )),
+        'price_band'
+    )
+    # Prices have cents, so the inclusive max_price filter of a band is one cent below its max
+    return [
+        {
+            'min': low,
+            'max': high,
+            'max_price': Decimal(high) - Decimal('0.01') if high is not None else None,
+            'count': band_counts.get(band, 0),
+        }
+        for band, (low, high) in enumerate(PRICE_BANDS)
+    ]
+
+
+def product_facets(filtered, filters):
+    """
+    Facet counts for the current filter state. filtered(exclude) must return
+    the product queryset with every filter applied except the one named by
+    exclude; filters is the dict of active filter values (the cache signature).
+    Returns {'categories': {id: count}, 'event_types': {id: count},
+    'selling_types': {value: count}, 'price_bands': [{min, max, max_price, count}]}.
+    """
+    signature = '&'.join(f'{name}={value}' for name, value in sorted(filters.items()) if value)
+    digest = hashlib.md5(signature.encode()).hexdigest()
+    key = f'facets:{get_version(CATALOGUE_VERSION_KEY)}:{digest}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = {
+            'categories': _roll_up(_grouped_counts(filtered('category'), 'category_id')),
+            'event_types': _grouped_counts(filtered('event'), 'event_types'),
+            'selling_types': _grouped_counts(filtered('type'), 'selling_type'),
+            'price_bands': _price_band_counts(filtered('price')),
+        }
+        cache.set(key, facets, FACETS_TIMEOUT)
+    return facets
@@ -0,0 +1,114 @@
+"""
+Home page sections, served from the shared cache.
+
+Each section is cached per language together with the version token of the
+data it shows, and each has its own version key, bumped by the signal
+handlers when that data changes. Requests never build a section: an entry
+with an outdated version is still served while a Celery task rebuilds it
+(stale-while-revalidate), and a missing entry is served empty and scheduled
+the same way. The refresh_home_sections beat task keeps all of them warm.
+"""
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import translation
+from .cache import bump_version, get_version
+from .models import Category, EventType, Product
+
+# Seconds during which a scheduled rebuild is not scheduled again
+REFRESH_LOCK_TIMEOUT = 60
+
+# Seconds to skip scheduling after the broker could not be reached
+BROKER_RETRY_INTERVAL = 30
+
+_broker_down_until = 0
+
+
+def _event_types():
+    return list(EventType.objects.filter(is_active=True)[:6])
+
+
+def _featured_categories():
+    return list(Category.objects.filter(is_active=True, parent__isnull=True).defer('description')[:6])
+
+
+def _featured_products():
+    return list(Product.objects.listed().filter(is_featured=True)[:8])
+
+
+def _latest_products():
+    return list(Product.objects.listed().order_by('-created_at')[:8])
+
+
+HOME_SECTIONS = {
+    'event_types': _event_types,
+    'featured_categories': _featured_categories,
+    'featured_products': _featured_products,
+    'latest_products': _latest_products,
+}
+
+
+def _version_key(section):
+    return f'home-section-version:{section}'
+
+
+def _entry_key(section, language):
+    return f'home-section:{section}:{language}'
+
+
+def _lock_key(section, language):
+    return f'home-section-refresh:{section}:{language}'
+
+
+def build_section(section, language):
+    """Build one section from the database and store it in the cache."""
+    version = get_version(_version_key(section))
+    with translation.override(language):
+        items = HOME_SECTIONS[section]()
+    cache.set(_entry_key(section, language), {'version': version, 'items': items}, None)
+    cache.delete(_lock_key(section, language))
+    return items
+
+
+def schedule_refresh(section, language):
+    """
+    Queue a rebuild of a section unless one is already queued. Returns False
+    when the broker cannot be reached.
+    """
+    global _broker_down_until
+    if time.monotonic() < _broker_down_until:
+        return False
+    if not cache.add(_lock_key(section, language), True, REFRESH_LOCK_TIMEOUT):
+        return True
+    from apps.notifications.tasks import refresh_home_sections
+    try:
+        refresh_home_sections.delay([section], [language])
+        return True
+    except Exception as e:
+        print(f"Failed to schedule home section refresh: {e}")
+        _broker_down_until = time.monotonic() + BROKER_RETRY_INTERVAL
+        cache.delete(_lock_key(section, language))
+        return False
+
+
+def get_home_sections(language=None):
+    """{section: items} for the home page, from the cache only."""
+    language = language or translation.get_language()
+    sections = {}
+    for section in HOME_SECTIONS:
+        entry = cache.get(_entry_key(section, language))
+        if entry is not None and entry['version'] == get_version(_version_key(section)):
+            sections[section] = entry['items']
+        elif schedule_refresh(section, language):
+            # Outdated sections are served as they are, cold ones empty,
+            # until the worker has rebuilt them
+            sections[section] = entry['items'] if entry else []
+        else:
+            # No worker can be reached at all
+            sections[section] = build_section(section, language)
+    return sections
+
+
+def home_sections_changed(*sections):
+    """Invalidate sections once the transaction commits; the next home page view schedules their rebuild."""
+    transaction.on_commit(lambda: [bump_version(_version_key(section)) for section in sections])
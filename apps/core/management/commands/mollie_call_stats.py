@@ -0,0 +1,20 @@
+"""
+Management command to report the latency of Mollie API calls.
+"""
+from django.core.management.base import BaseCommand
+from apps.payments.client import mollie_call_stats
+
+
+class Command(BaseCommand):
+    help = 'Show call counts, errors and average latency of Mollie API calls'
+
+    def handle(self, *args, **options):
+        stats = mollie_call_stats()
+        if not stats:
+            self.stdout.write('No Mollie calls recorded.')
+            return
+        for (method, resource), row in stats.items():
+            self.stdout.write(
+                f"{method} {resource}: {row['count']} calls  {row['errors']} errors  "
+                f"avg {row['avg_ms']:.0f} ms"
+            )
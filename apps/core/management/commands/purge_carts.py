@@ -0,0 +1,12 @@
+"""
+Management command to purge empty and abandoned carts.
+"""
+from django.core.management.base import BaseCommand
+from apps.notifications.tasks import purge_stale_carts
+
+
+class Command(BaseCommand):
+    help = 'Delete empty carts, guest carts with an expired session and expired sessions'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(purge_stale_carts()))
@@ -0,0 +1,22 @@
+"""
+Management command to rebuild the rental availability ledger.
+"""
+from django.core.management.base import BaseCommand
+from apps.core.models import RentalAvailability
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the rental availability ledger from unreturned rental records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product',
+            type=int,
+            action='append',
+            dest='products',
+            help='Only rebuild the ledger for this product ID (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        days = RentalAvailability.rebuild(product_ids=options['products'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt availability ledger ({days} reserved days)'))
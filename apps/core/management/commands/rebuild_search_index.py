@@ -0,0 +1,13 @@
+"""
+Management command to rebuild the product full-text search index.
+"""
+from django.core.management.base import BaseCommand
+from apps.core.search import index_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all products'
+
+    def handle(self, *args, **options):
+        index_products()
+        self.stdout.write(self.style.SUCCESS('Rebuilt product search index'))
@@ -0,0 +1,15 @@
+"""
+Management command to report the search result cache counters.
+"""
+from django.core.management.base import BaseCommand
+from apps.core.search import search_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counts of the search result cache'
+
+    def handle(self, *args, **options):
+        stats = search_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit ratio: {ratio:.1f}%")
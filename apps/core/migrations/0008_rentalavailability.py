@@ -0,0 +1,59 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+
+
+def build_availability_ledger(apps, schema_editor):
+    """
+    Rental products used to have their stock deducted while rented out.
+    Give that stock back (stock is now the number of units owned) and
+    reserve the open rental periods in the availability ledger instead.
+    """
+    Product = apps.get_model('core', 'Product')
+    RentalRecord = apps.get_model('core', 'RentalRecord')
+    RentalAvailability = apps.get_model('core', 'RentalAvailability')
+
+    rented_out = {}
+    reserved = {}
+    for rental in RentalRecord.objects.filter(is_returned=False).iterator():
+        rented_out[rental.product_id] = rented_out.get(rental.product_id, 0) + rental.quantity
+        for i in range((rental.return_date - rental.rental_start_date).days + 1):
+            key = (rental.product_id, rental.rental_start_date + timedelta(days=i))
+            reserved[key] = reserved.get(key, 0) + rental.quantity
+
+    for product in Product.objects.filter(pk__in=rented_out, selling_type='rental'):
+        product.stock += rented_out[product.pk]
+        product.save(update_fields=['stock'])
+
+    RentalAvailability.objects.bulk_create(
+        [RentalAvailability(product_id=product_id, day=day, reserved=quantity)
+         for (product_id, day), quantity in reserved.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_costs_delivery_cost_enabled'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reserved', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='core.product')),
+            ],
+            options={
+                'verbose_name': 'Rental Availability',
+                'verbose_name_plural': 'Rental Availability',
+                'unique_together': {('product', 'day')},
+            },
+        ),
+        migrations.RunPython(build_availability_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_rentalavailability'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(check=models.Q(('stock__gte', 0)), name='core_product_stock_non_negative'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_primary_images(apps, schema_editor):
+    """Point every product at its primary image and cache its URL and dimensions."""
+    Product = apps.get_model('core', 'Product')
+    ProductImage = apps.get_model('core', 'ProductImage')
+
+    seen = set()
+    for image in ProductImage.objects.order_by('product_id', '-is_primary', 'order').iterator():
+        if image.product_id in seen:
+            continue
+        seen.add(image.product_id)
+        try:
+            width, height = image.image.width, image.image.height
+        except (OSError, ValueError):
+            width, height = None, None
+        Product.objects.filter(pk=image.product_id).update(
+            primary_image=image,
+            primary_image_url=image.image.url,
+            primary_image_width=width,
+            primary_image_height=height,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_product_stock_non_negative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.productimage'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_url',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(set_primary_images, migrations.RunPython.noop),
+    ]
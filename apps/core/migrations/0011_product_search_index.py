@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# Indexed columns with their PostgreSQL rank weight, and the text search
+# configurations, as of this migration
+SEARCH_FIELDS = [
+    ('p.name', 'A'),
+    ('c.name', 'B'),
+    ('p.short_description', 'C'),
+    ('p.description', 'D'),
+]
+SEARCH_CONFIGS = ['dutch', 'english']
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the full-text search index: a GIN-indexed tsvector column on
+    PostgreSQL, an FTS5 table on SQLite. Other databases search without one.
+    """
+    product_table = apps.get_model('core', 'Product')._meta.db_table
+    category_table = apps.get_model('core', 'Category')._meta.db_table
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE core_product ADD COLUMN search_vector tsvector')
+        schema_editor.execute(
+            'CREATE INDEX core_product_search_vector_gin ON core_product USING gin (search_vector)'
+        )
+        search_vector = ' || '.join(
+            f"setweight(to_tsvector('{config}', coalesce({column}, '')), '{weight}')"
+            for column, weight in SEARCH_FIELDS
+            for config in SEARCH_CONFIGS
+        )
+        schema_editor.execute(
+            f"UPDATE {product_table} AS p SET search_vector = {search_vector} "
+            f"FROM {category_table} AS c WHERE c.id = p.category_id"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE core_product_fts USING fts5("
+            "name, category, short_description, description, "
+            "tokenize='porter unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO core_product_fts (rowid, name, category, short_description, description) "
+            "SELECT p.id, p.name, c.name, p.short_description, p.description "
+            f"FROM {product_table} p JOIN {category_table} c ON c.id = p.category_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_product_search_vector_gin')
+        schema_editor.execute('ALTER TABLE core_product DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_product_primary_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Indexed columns with their rank weight, the text search configurations and
+# the folded accented letters, as of this migration
+SEARCH_FIELDS = [
+    ('p.name', 'A'),
+    ('c.name', 'B'),
+    ('p.short_description', 'C'),
+    ('p.description', 'D'),
+]
+SEARCH_CONFIGS = ['dutch', 'english']
+ACCENTED_LETTERS = 'áàâäãåéèêëíìîïóòôöõúùûüýÿçñÁÀÂÄÃÅÉÈÊËÍÌÎÏÓÒÔÖÕÚÙÛÜÝÇÑ'
+PLAIN_LETTERS = 'aaaaaaeeeeiiiiooooouuuuyycnAAAAAAEEEEIIIIOOOOOUUUUYCN'
+
+
+def reindex_products(apps, schema_editor):
+    """Rebuild the PostgreSQL search vectors, which now fold accented letters."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    product_table = apps.get_model('core', 'Product')._meta.db_table
+    category_table = apps.get_model('core', 'Category')._meta.db_table
+    search_vector = ' || '.join(
+        f"setweight(to_tsvector('{config}', translate(coalesce({column}, ''), "
+        f"'{ACCENTED_LETTERS}', '{PLAIN_LETTERS}')), '{weight}')"
+        for column, weight in SEARCH_FIELDS
+        for config in SEARCH_CONFIGS
+    )
+    schema_editor.execute(
+        f"UPDATE {product_table} AS p SET search_vector = {search_vector} "
+        f"FROM {category_table} AS c WHERE c.id = p.category_id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_product_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_reindex_search_accents'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='core_product_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name', 'id'], name='core_product_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='core_product_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalrecord',
+            index=models.Index(fields=['-rental_start_date', '-created_at', '-id'], name='core_rental_start_created_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:50
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Coalesce, NullIf
+
+
+def set_effective_prices(apps, schema_editor):
+    """Store the sale price, or the price when there is no sale, on every product."""
+    Product = apps.get_model('core', 'Product')
+    Product.objects.update(effective_price=Coalesce(NullIf('sale_price', Value(Decimal('0'))), 'price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='core_product_price_id_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(set_effective_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price', 'id'], name='core_product_eff_price_id_idx'),
+        ),
+    ]
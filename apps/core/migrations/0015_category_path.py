@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:53
+
+from django.db import migrations, models
+
+
+def set_category_paths(apps, schema_editor):
+    """Store the materialized path and depth of every category."""
+    Category = apps.get_model('core', 'Category')
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+
+    def path_of(category_id, seen=()):
+        parent_id = parents[category_id]
+        if parent_id is None or parent_id in seen:
+            return f'/{category_id}/'
+        return f'{path_of(parent_id, seen + (category_id,))}{category_id}/'
+
+    for category_id in parents:
+        path = path_of(category_id)
+        Category.objects.filter(pk=category_id).update(path=path, depth=path.count('/') - 2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(set_category_paths, migrations.RunPython.noop),
+    ]
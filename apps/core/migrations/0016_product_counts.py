@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-17 01:54
+
+from django.db import migrations, models
+
+
+def count_products(apps, schema_editor):
+    """Store the number of active products of every category and event type."""
+    Category = apps.get_model('core', 'Category')
+    EventType = apps.get_model('core', 'EventType')
+    Product = apps.get_model('core', 'Product')
+    active = Product.objects.filter(is_active=True)
+
+    for category in Category.objects.all():
+        Category.objects.filter(pk=category.pk).update(
+            product_count=active.filter(category__path__startswith=category.path).count()
+        )
+    for event_type in EventType.objects.all():
+        EventType.objects.filter(pk=event_type.pk).update(
+            product_count=active.filter(event_types=event_type).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='products'),
+        ),
+        migrations.AddField(
+            model_name='eventtype',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='products'),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,33 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Greatest, Substr
 from django.urls import reverse
 from django.utils.text import slugify
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
+from .cache import bump_version, get_singleton, singleton_changed
+
+
+def _count_subquery(products):
+    """Correlated subquery counting the given products (0 when there are none)."""
+    counts = products.order_by().values('is_active').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+class EventTypeManager(models.Manager):
+    """Manager maintaining the denormalized product counts of event types."""
+
+    def refresh_product_counts(self, event_type_ids=None):
+        """Recount the active products of the given event types, or of all event types."""
+        event_types = self.get_queryset()
+        if event_type_ids is not None:
+            event_types = event_types.filter(pk__in=list(event_type_ids))
+        event_types.update(product_count=_count_subquery(
+            Product.objects.filter(is_active=True, event_types=OuterRef('pk'))
+        ))
 
 
 class EventType(models.Model):
@@ -15,9 +39,16 @@ class EventType(models.Model):
     image = models.ImageField(upload_to='event_types/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
     order = models.PositiveIntegerField(default=0)
+    # Number of active products, maintained by the signal handlers in signals.py
+    product_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='products')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EventTypeManager()
+
+    # Columns maintained in the database, left out of ordinary saves
+    MAINTAINED_FIELDS = ('product_count',)
+
     class Meta:
         ordering = ['order', 'name']
         verbose_name = 'Event Type'
@@ -29,12 +60,40 @@ class EventType(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Don't overwrite the count the signal handlers keep with an outdated instance value
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse('core:event_type_detail', kwargs={'slug': self.slug})
 
 
+class CategoryManager(models.Manager):
+    """Manager maintaining the denormalized product counts of categories."""
+
+    def refresh_product_counts(self, category_ids=None):
+        """
+        Recount the active products of the given categories, or of all
+        categories, including the products of their subcategories.
+        """
+        categories = self.get_queryset()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=list(category_ids))
+        categories.update(product_count=_count_subquery(
+            Product.objects.filter(is_active=True, category__path__startswith=OuterRef('path'))
+        ))
+
+    def refresh_product_counts_along(self, *paths):
+        """Recount the categories on the given paths, from the roots down."""
+        self.refresh_product_counts({
+            int(category_id) for path in paths if path for category_id in path.strip('/').split('/')
+        })
+
+
 class Category(models.Model):
     """Product categories like Cakes, Decorations, Catering, DJs, etc."""
     name = models.CharField(max_length=100)
@@ -49,12 +108,24 @@ class Category(models.Model):
         blank=True, 
         related_name='subcategories'
     )
+    # Materialized path of IDs from the root down to this category ('/1/5/12/'),
+    # maintained by save(), so a whole subtree is one indexed prefix query
+    path = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
+    # Number of active products in this category and its subcategories,
+    # maintained by the signal handlers in signals.py
+    product_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='products')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryManager()
+
+    # Columns maintained in the database, left out of ordinary saves
+    MAINTAINED_FIELDS = ('path', 'depth', 'product_count')
+
     class Meta:
         ordering = ['order', 'name']
         verbose_name = 'Category'
@@ -63,10 +134,51 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if self.pk and self.parent_id and self.parent_id in self.get_descendants().values_list('pk', flat=True):
+            raise ValidationError({'parent': 'A category cannot be placed under itself or one of its subcategories.'})
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Path and count are kept by _update_path and the signal handlers;
+            # don't overwrite them from an instance loaded before they changed
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._update_path()
+
+    def _update_path(self):
+        """Recompute the path after an insert or move and carry the subtree along."""
+        # Read the stored paths, the instances may predate a move higher up the tree
+        old_path, old_depth = Category.objects.filter(pk=self.pk).values_list('path', 'depth').get()
+        parent_path = '/'
+        if self.parent_id:
+            parent_path = Category.objects.filter(pk=self.parent_id).values_list('path', flat=True).get()
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError(f"Category {self.pk} cannot be placed under its own subcategory")
+        path = f'{parent_path}{self.pk}/'
+        depth = path.count('/') - 2
+        if path != old_path:
+            if old_path:
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (depth - old_depth)
+                )
+            Category.objects.filter(pk=self.pk).update(path=path, depth=depth)
+            if old_path:
+                # The subtree's products moved from the old ancestors to the new ones
+                Category.objects.refresh_product_counts_along(old_path, path)
+        self.path, self.depth = path, depth
+
+    def get_descendants(self, include_self=True):
+        """This category and all categories below it, at any depth."""
+        descendants = Category.objects.filter(path__startswith=self.path)
+        return descendants if include_self else descendants.exclude(pk=self.pk)
 
     def get_absolute_url(self):
         return reverse('core:category_detail', kwargs={'slug': self.slug})
@@ -76,6 +188,135 @@ class Category(models.Model):
         return self.products.filter(is_active=True)
 
 
+class ProductQuerySet(models.QuerySet):
+    """
+    Catalogue queries shared by the storefront views and the API. Many-to-many
+    filters are EXISTS subqueries, so filtered listings need no JOIN + DISTINCT
+    over every selected column.
+    """
+    # Text columns only product detail pages show
+    LIST_DEFERRED_FIELDS = ('description', 'short_description', 'meta_title', 'meta_description')
+
+    def listed(self):
+        """Active products with their category, without the large text columns."""
+        return self.filter(is_active=True).select_related('category').defer(
+            *self.LIST_DEFERRED_FIELDS, 'category__description'
+        )
+
+    def for_event_type(self, event_type):
+        """Products for an event type, given as an EventType or its slug."""
+        links = Product.event_types.through.objects.filter(product=OuterRef('pk'))
+        if isinstance(event_type, str):
+            links = links.filter(eventtype__slug=event_type)
+        else:
+            links = links.filter(eventtype=event_type)
+        return self.filter(Exists(links))
+
+    def in_category(self, category):
+        """Products in a category or any of its subcategories."""
+        return self.filter(category__path__startswith=category.path)
+
+    def sold_with(self, rental_product):
+        """Selling products that list the given rental product as related."""
+        links = Product.related_rental_products.through.objects.filter(
+            from_product=OuterRef('pk'),
+            to_product=rental_product
+        )
+        return self.filter(Exists(links), selling_type=Product.SELLING_TYPE_SELLING)
+
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
+    """Manager with batch availability checks and denormalized field maintenance for products."""
+
+    def check_availability(self, lines, products=None):
+        """
+        Check availability for many cart lines with a fixed number of queries.
+        Each line is a (product_id, start_date, end_date, quantity) tuple, with
+        empty dates for selling products. Lines are checked in order and units
+        claimed by earlier lines are not available to later ones.
+        Products already loaded by the caller can be passed as a {id: product} dict.
+        Returns a list of (is_available, message) tuples in the same order.
+        """
+        lines = list(lines)
+        if products is None:
+            products = self.in_bulk({line[0] for line in lines})
+        
+        # Load every ledger day covering the requested rental periods at once
+        rental_lines = [
+            line for line in lines
+            if line[0] in products and products[line[0]].is_rental and line[1] and line[2]
+        ]
+        reserved = {}
+        if rental_lines:
+            ledger = RentalAvailability.objects.filter(
+                product_id__in={line[0] for line in rental_lines},
+                day__range=(min(line[1] for line in rental_lines), max(line[2] for line in rental_lines))
+            ).values_list('product_id', 'day', 'reserved')
+            reserved = {(product_id, day): quantity for product_id, day, quantity in ledger}
+        
+        claimed = {}
+        results = []
+        for product_id, start_date, end_date, quantity in lines:
+            product = products.get(product_id)
+            if product is None:
+                results.append((False, "Product not found"))
+                continue
+            
+            if not product.is_rental:
+                key = (product_id, None)
+                result = product.can_purchase(claimed.get(key, 0) + quantity)
+                if result[0]:
+                    claimed[key] = claimed.get(key, 0) + quantity
+                results.append(result)
+                continue
+            
+            if not start_date or not end_date:
+                results.append((False, "Rental dates are required for rental products"))
+                continue
+            
+            result = product.check_rental_period(start_date, end_date)
+            if not result[0]:
+                results.append(result)
+                continue
+            
+            days = RentalAvailability.days_between(start_date, end_date)
+            peak = max(reserved.get((product_id, day), 0) + claimed.get((product_id, day), 0) for day in days)
+            available = max(0, product.stock - peak)
+            if quantity > available:
+                results.append((False, f"Only {available} items available for this period"))
+                continue
+            
+            for day in days:
+                claimed[(product_id, day)] = claimed.get((product_id, day), 0) + quantity
+            results.append((True, "Available"))
+        
+        return results
+
+    def refresh_primary_image(self, product_id):
+        """
+        Point the product at its primary image (the one flagged primary, else
+        the first by order) and cache that image's URL and dimensions.
+        """
+        image = ProductImage.objects.filter(product_id=product_id).order_by('-is_primary', 'order').first()
+        if image:
+            width, height = image.dimensions
+            self.filter(pk=product_id).update(
+                updated_at=timezone.now(),
+                primary_image=image,
+                primary_image_url=image.image.url,
+                primary_image_width=width,
+                primary_image_height=height,
+            )
+        else:
+            self.filter(pk=product_id).update(
+                updated_at=timezone.now(),
+                primary_image=None,
+                primary_image_url='',
+                primary_image_width=None,
+                primary_image_height=None,
+            )
+
+
 class Product(models.Model):
     """Products and services for events."""
     
@@ -86,6 +327,8 @@ class Product(models.Model):
         (SELLING_TYPE_RENTAL, 'Rental'),
         (SELLING_TYPE_SELLING, 'Selling'),
     ]
+
+    PRIMARY_IMAGE_FIELDS = ('primary_image', 'primary_image_url', 'primary_image_width', 'primary_image_height')
     
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True, blank=True)
@@ -93,6 +336,9 @@ class Product(models.Model):
     short_description = models.CharField(max_length=300, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     sale_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Sale price if set, otherwise price; kept in sync by save() so catalogue
+    # price filters and sorting run in SQL on an indexed column
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     category = models.ForeignKey(
         Category, 
         on_delete=models.CASCADE, 
@@ -141,14 +387,39 @@ class Product(models.Model):
     meta_title = models.CharField(max_length=70, blank=True)
     meta_description = models.CharField(max_length=160, blank=True)
     
+    # Primary image, maintained from ProductImage changes (see refresh_primary_image)
+    # so listings can select_related it or use the cached URL directly
+    primary_image = models.ForeignKey(
+        'ProductImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+    primary_image_url = models.CharField(max_length=500, blank=True, editable=False)
+    primary_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    primary_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductManager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
+        constraints = [
+            models.CheckConstraint(check=models.Q(stock__gte=0), name='core_product_stock_non_negative'),
+        ]
+        indexes = [
+            # Keyset pagination of the catalogue and dashboard product lists
+            models.Index(fields=['-created_at', '-id'], name='core_product_created_id_idx'),
+            models.Index(fields=['name', 'id'], name='core_product_name_id_idx'),
+            models.Index(fields=['effective_price', 'id'], name='core_product_eff_price_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -158,16 +429,22 @@ class Product(models.Model):
             self.slug = slugify(self.name)
         if not self.short_description and self.description:
             self.short_description = self.description[:297] + '...' if len(self.description) > 300 else self.description
+        self.effective_price = self.current_price
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'sale_price'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'effective_price'}
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # The primary image fields are maintained by refresh_primary_image;
+            # don't overwrite them from an instance loaded before an image change
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.PRIMARY_IMAGE_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse('core:product_detail', kwargs={'slug': self.slug})
 
-    @property
-    def primary_image(self):
-        primary = self.images.filter(is_primary=True).first()
-        return primary if primary else self.images.first()
-
     @property
     def current_price(self):
         """Returns sale price if available, otherwise regular price."""
@@ -203,12 +480,7 @@ class Product(models.Model):
         This looks at selling products that have this rental product in their related_rental_products.
         """
         if self.is_rental:
-            return Product.objects.filter(
-                selling_type=self.SELLING_TYPE_SELLING,
-                related_rental_products=self,
-                is_active=True,
-                is_available=True
-            )
+            return Product.objects.sold_with(self).filter(is_active=True, is_available=True)
         return Product.objects.none()
 
     def get_min_rental_date(self):
@@ -228,29 +500,15 @@ class Product(models.Model):
     def get_available_stock(self, start_date, end_date):
         """
         Calculate available stock for a given date range.
-        Since stock is deducted immediately when order is placed,
-        available stock = current stock + items returning before start_date
+        For rental products stock is the number of units owned; every unit
+        reserved on any day of the range is unavailable for the whole range,
+        so available stock = stock - peak reservation in the availability ledger.
         """
-        from apps.core.models import RentalRecord
-        
-        # Start with current stock (already has rentals deducted)
-        available = self.stock
-        
-        # Add back items that will be returned BEFORE our rental starts
-        # These items will be available by the time our rental begins
-        returning_before_start = RentalRecord.objects.filter(
-            product=self,
-            is_returned=False,
-            return_date__lt=start_date  # Return date is before our start
-        )
-        
-        for rental in returning_before_start:
-            available += rental.quantity
-        
-        return max(0, available)
+        peak = RentalAvailability.peak_reserved(self.pk, start_date, end_date)
+        return max(0, self.stock - peak)
 
-    def can_rent(self, start_date, end_date, quantity):
-        """Check if the product can be rented for the given dates and quantity."""
+    def check_rental_period(self, start_date, end_date):
+        """Check the rental dates against this product's date restrictions."""
         # Only rental products can be rented
         if not self.is_rental:
             return False, "This product is for sale only, not rental"
@@ -267,9 +525,15 @@ class Product(models.Model):
         if end_date <= start_date:
             return False, "Return date must be after start date"
         
-        # Check stock availability
-        # Stock is now directly deducted when order is placed, so we check current stock
-        # But for future rentals, we also count items that will be returned before start_date
+        return True, "Available"
+
+    def can_rent(self, start_date, end_date, quantity):
+        """Check if the product can be rented for the given dates and quantity."""
+        is_valid, message = self.check_rental_period(start_date, end_date)
+        if not is_valid:
+            return is_valid, message
+        
+        # Check stock availability against the reservations in the ledger
         available = self.get_available_stock(start_date, end_date)
         if quantity > available:
             return False, f"Only {available} items available for this period"
@@ -337,6 +601,10 @@ class RentalRecord(models.Model):
         ordering = ['-rental_start_date', '-created_at']
         verbose_name = 'Rental Record'
         verbose_name_plural = 'Rental Records'
+        indexes = [
+            # Keyset pagination of the dashboard stock list
+            models.Index(fields=['-rental_start_date', '-created_at', '-id'], name='core_rental_start_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.quantity}x ({self.rental_start_date} to {self.return_date})"
@@ -355,18 +623,151 @@ class RentalRecord(models.Model):
             return 0
         return (timezone.now().date() - self.return_date).days
 
+    def reservation(self):
+        """(product_id, start_date, end_date, quantity) held in the availability ledger, or None."""
+        if self.is_returned:
+            return None
+        return (self.product_id, self.rental_start_date, self.return_date, self.quantity)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                stored = RentalRecord.objects.filter(pk=self.pk).first()
+                previous = stored.reservation() if stored else None
+            super().save(*args, **kwargs)
+            # Move the reserved period in the availability ledger along with the record
+            current = self.reservation()
+            if previous != current:
+                if previous:
+                    RentalAvailability.release(*previous)
+                if current:
+                    RentalAvailability.reserve(*current)
+
     def mark_returned(self):
-        """Mark the rental as returned and restore stock."""
+        """Mark the rental as returned, which releases its reserved days."""
         if not self.is_returned:
-            # Restore stock to product
-            self.product.stock += self.quantity
-            self.product.save(update_fields=['stock'])
-            
             self.is_returned = True
             self.returned_at = timezone.now()
             self.save()
 
 
+class RentalAvailability(models.Model):
+    """
+    Availability ledger: number of rented units per product per day.
+    A row only exists for days on which at least one unit is reserved.
+    """
+    product = models.ForeignKey(
+        'Product',
+        on_delete=models.CASCADE,
+        related_name='availability'
+    )
+    day = models.DateField()
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['product', 'day']
+        verbose_name = 'Rental Availability'
+        verbose_name_plural = 'Rental Availability'
+
+    def __str__(self):
+        return f"{self.product_id} - {self.day}: {self.reserved} reserved"
+
+    @staticmethod
+    def version_key(product_id):
+        """Cache key of the token that changes whenever a product's reservations change."""
+        return f'availability-version:{product_id}'
+
+    @classmethod
+    def changed(cls, product_id):
+        """Give the product a new availability version once the transaction commits."""
+        transaction.on_commit(lambda: bump_version(cls.version_key(product_id)))
+
+    @staticmethod
+    def days_between(start_date, end_date):
+        """All days from start_date up to and including end_date."""
+        return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+    @classmethod
+    def reserve(cls, product_id, start_date, end_date, quantity):
+        """Add quantity to every day of the rental period."""
+        cls.reserve_many([(product_id, start_date, end_date, quantity)])
+
+    @classmethod
+    def reserve_many(cls, periods):
+        """
+        Reserve many (product_id, start_date, end_date, quantity) rental periods.
+        Uses one insert plus one update per distinct daily quantity.
+        """
+        increments = {}
+        for product_id, start_date, end_date, quantity in periods:
+            for day in cls.days_between(start_date, end_date):
+                increments[(product_id, day)] = increments.get((product_id, day), 0) + quantity
+        if not increments:
+            return
+        
+        # Insert missing days at zero first so the increments below stay atomic
+        cls.objects.bulk_create(
+            [cls(product_id=product_id, day=day) for product_id, day in increments],
+            ignore_conflicts=True,
+            batch_size=1000
+        )
+        days_by_quantity = {}
+        for (product_id, day), quantity in increments.items():
+            days_by_quantity.setdefault(quantity, {}).setdefault(product_id, []).append(day)
+        for quantity, product_days in days_by_quantity.items():
+            condition = Q()
+            for product_id, days in product_days.items():
+                condition |= Q(product_id=product_id, day__in=days)
+            cls.objects.filter(condition).update(reserved=F('reserved') + quantity)
+        
+        for product_id in {product_id for product_id, day in increments}:
+            cls.changed(product_id)
+
+    @classmethod
+    def release(cls, product_id, start_date, end_date, quantity):
+        """Remove quantity from every day of the rental period."""
+        days = cls.objects.filter(product_id=product_id, day__range=(start_date, end_date))
+        days.update(reserved=Greatest(F('reserved') - quantity, 0))
+        days.filter(reserved=0).delete()
+        cls.changed(product_id)
+
+    @classmethod
+    def peak_reserved(cls, product_id, start_date, end_date):
+        """Highest number of units reserved on any day of the period."""
+        return cls.objects.filter(
+            product_id=product_id,
+            day__range=(start_date, end_date)
+        ).aggregate(peak=Max('reserved'))['peak'] or 0
+
+    @classmethod
+    def rebuild(cls, product_ids=None):
+        """Recompute the ledger from the unreturned rental records."""
+        rentals = RentalRecord.objects.filter(is_returned=False)
+        rows = cls.objects.all()
+        if product_ids is not None:
+            rentals = rentals.filter(product_id__in=product_ids)
+            rows = rows.filter(product_id__in=product_ids)
+        
+        reserved = {}
+        for product_id, start_date, end_date, quantity in rentals.values_list(
+            'product_id', 'rental_start_date', 'return_date', 'quantity'
+        ).iterator():
+            for day in cls.days_between(start_date, end_date):
+                reserved[(product_id, day)] = reserved.get((product_id, day), 0) + quantity
+        
+        changed_ids = set(rows.values_list('product_id', flat=True)) | {key[0] for key in reserved}
+        rows.delete()
+        cls.objects.bulk_create(
+            [cls(product_id=product_id, day=day, reserved=quantity)
+             for (product_id, day), quantity in reserved.items()],
+            batch_size=1000
+        )
+        for product_id in changed_ids:
+            cls.changed(product_id)
+        return len(reserved)
+
+
 class ProductImage(models.Model):
     """Product images with ordering support."""
     product = models.ForeignKey(
@@ -397,6 +798,14 @@ class ProductImage(models.Model):
             self.is_primary = True
         super().save(*args, **kwargs)
 
+    @property
+    def dimensions(self):
+        """(width, height) of the image file, or (None, None) when it cannot be read."""
+        try:
+            return self.image.width, self.image.height
+        except (OSError, ValueError):
+            return None, None
+
 
 class SiteSettings(models.Model):
     """Singleton model for site-wide settings."""
@@ -439,11 +848,17 @@ class SiteSettings(models.Model):
         # Ensure only one instance exists
         self.pk = 1
         super().save(*args, **kwargs)
+        singleton_changed(type(self))
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        singleton_changed(type(self))
+        return result
 
     @classmethod
     def get_settings(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        """Get the single SiteSettings instance (cached in process memory)."""
+        return get_singleton(cls, lambda: cls.objects.get_or_create(pk=1)[0])
 
 
 class FAQ(models.Model):
@@ -482,11 +897,19 @@ class RentalTerms(models.Model):
         # Ensure only one instance exists
         self.pk = 1
         super().save(*args, **kwargs)
+        singleton_changed(type(self))
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        singleton_changed(type(self))
+        return result
 
     @classmethod
     def get_terms(cls):
-        obj, created = cls.objects.get_or_create(pk=1, defaults={'title': 'Rental Terms and Conditions'})
-        return obj
+        """Get the single RentalTerms instance (cached in process memory)."""
+        return get_singleton(cls, lambda: cls.objects.get_or_create(
+            pk=1, defaults={'title': 'Rental Terms and Conditions'}
+        )[0])
 
 
 class Services(models.Model):
@@ -507,12 +930,19 @@ class Services(models.Model):
         # Ensure only one instance exists
         self.pk = 1
         super().save(*args, **kwargs)
+        singleton_changed(type(self))
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        singleton_changed(type(self))
+        return result
 
     @classmethod
     def get_services(cls):
-        """Get or create the single Services instance."""
-        obj, created = cls.objects.get_or_create(pk=1, defaults={'title': 'Our Services'})
-        return obj
+        """Get or create the single Services instance (cached in process memory)."""
+        return get_singleton(cls, lambda: cls.objects.get_or_create(
+            pk=1, defaults={'title': 'Our Services'}
+        )[0])
 
 
 class Costs(models.Model):
@@ -561,15 +991,20 @@ class Costs(models.Model):
         # Ensure only one instance exists
         self.pk = 1
         super().save(*args, **kwargs)
+        singleton_changed(type(self))
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        singleton_changed(type(self))
+        return result
 
     @classmethod
     def get_costs(cls):
-        """Get or create the single Costs instance."""
-        obj, created = cls.objects.get_or_create(pk=1, defaults={
-            'btw_percentage': 21.00,
+        """Get or create the single Costs instance (cached in process memory)."""
+        return get_singleton(cls, lambda: cls.objects.get_or_create(pk=1, defaults={
+            'btw_percentage': Decimal('21.00'),
             'btw_type': 'inclusif',
             'delivery_cost_enabled': True,
-            'delivery_cost': 0.00
-        })
-        return obj
+            'delivery_cost': Decimal('0.00')
+        })[0])
 
@@ -0,0 +1,229 @@
+"""
+Keyset (seek) pagination for long list views.
+
+Pages are addressed by an opaque cursor holding the sort key of the last row
+shown instead of a page number, so every page is one indexed range scan
+(WHERE (created_at, id) < (%s, %s) ORDER BY created_at DESC, id DESC LIMIT n)
+no matter how deep the visitor goes, and rows added meanwhile do not shift
+the pages. The ordering must consist of non-null fields of the model itself;
+the primary key is added as the final tie-breaker.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.db import connection
+from django.db.models import Q, QuerySet
+
+# Above this planner estimate the total is shown as an approximation
+APPROXIMATE_COUNT_THRESHOLD = 1000
+
+
+def estimate_count(queryset):
+    """
+    Number of rows of a queryset: the PostgreSQL planner estimate when that is
+    large, an exact COUNT otherwise (small results and other databases).
+    """
+    queryset = queryset.order_by()
+    if connection.vendor == 'postgresql':
+        try:
+            plan = json.loads(queryset.explain(format='json'))
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            print(f"Could not estimate row count: {e}")
+        else:
+            if estimate >= APPROXIMATE_COUNT_THRESHOLD:
+                return estimate
+    return queryset.count()
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator, usable where templates expect page_obj."""
+    keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_query = ''
+        self.previous_query = ''
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def set_query(self, query_dict, cursor_kwarg='cursor', page_kwarg='page'):
+        """Query strings for the previous and next links, keeping other parameters."""
+        for direction in ('next', 'previous'):
+            cursor = getattr(self, f'{direction}_cursor')
+            if cursor is not None:
+                params = query_dict.copy()
+                params.pop(page_kwarg, None)
+                params[cursor_kwarg] = cursor
+                setattr(self, f'{direction}_query', params.urlencode())
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by seeking past the sort key of the previous page.
+    The ordering is taken from the queryset unless given explicitly.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None, approximate_count=True):
+        self.model = queryset.model
+        self.per_page = per_page
+        self.approximate_count = approximate_count
+        ordering = list(ordering or queryset.query.order_by or self.model._meta.ordering)
+
+        self.fields = []
+        for name in ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            field = self.model._meta.pk if name == 'pk' else self.model._meta.get_field(name)
+            self.fields.append((field, descending))
+        if not any(field.primary_key for field, _ in self.fields):
+            self.fields.append((self.model._meta.pk, self.fields[-1][1] if self.fields else False))
+        self.queryset = queryset.order_by(*self._ordering(forward=True))
+        self._count = None
+
+    @classmethod
+    def supports(cls, queryset):
+        """Whether a queryset is ordered by plain, non-null fields of its model only."""
+        if not isinstance(queryset, QuerySet):
+            return False
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        for name in ordering:
+            if not isinstance(name, str):
+                return False
+            name = name.lstrip('-')
+            if name == 'pk':
+                continue
+            try:
+                field = queryset.model._meta.get_field(name)
+            except Exception:
+                return False
+            if not field.concrete or field.null or field.is_relation:
+                return False
+        return True
+
+    @property
+    def count(self):
+        """Total number of rows, estimated for large results when allowed."""
+        if self._count is None:
+            if self.approximate_count:
+                self._count = estimate_count(self.queryset)
+            else:
+                self._count = self.queryset.order_by().count()
+        return self._count
+
+    def _ordering(self, forward):
+        return [
+            f'-{field.name}' if descending == forward else field.name
+            for field, descending in self.fields
+        ]
+
+    def _seek_filter(self, values, forward):
+        """Rows after (forward) or before the given sort key in list order."""
+        condition = Q()
+        for index, (field, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            seek = Q(**{f'{field.name}__{lookup}': values[index]})
+            for position, (previous, _) in enumerate(self.fields[:index]):
+                seek &= Q(**{previous.name: values[position]})
+            condition |= seek
+        return condition
+
+    def encode_cursor(self, obj, forward=True):
+        values = [_encode_value(getattr(obj, field.attname)) for field, _ in self.fields]
+        data = json.dumps(
+            {'o': self._ordering(forward=True), 'd': 'n' if forward else 'p', 'v': values},
+            separators=(',', ':')
+        )
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """(forward, values) for a cursor, or None when it is missing or invalid."""
+        if not cursor:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if data['o'] != self._ordering(forward=True):
+                # Cursor of another sort order
+                return None
+            values = [field.to_python(value) for (field, _), value in zip(self.fields, data['v'])]
+            return data['d'] == 'n', values
+        except Exception:
+            return None
+
+    def page(self, cursor=None):
+        """The page after (or before) the cursor; the first page without one."""
+        position = self.decode_cursor(cursor)
+        if position is None:
+            forward, values = True, None
+        else:
+            forward, values = position
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, forward))
+        if not forward:
+            queryset = queryset.order_by(*self._ordering(forward=False))
+
+        # One extra row tells whether there is more beyond this page
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if more or not forward:
+                next_cursor = self.encode_cursor(rows[-1], forward=True)
+            if (more and not forward) or (forward and values is not None):
+                previous_cursor = self.encode_cursor(rows[0], forward=False)
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin paginating with a KeysetPaginator and ?cursor= links.
+    Querysets that cannot be seeked (other orderings, ranked search results)
+    fall back to the regular page-number paginator.
+    """
+    cursor_kwarg = 'cursor'
+    approximate_count = True
+
+    def paginate_queryset(self, queryset, page_size):
+        if not KeysetPaginator.supports(queryset):
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, approximate_count=self.approximate_count)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        page.set_query(self.request.GET, self.cursor_kwarg, self.page_kwarg)
+        return paginator, page, page.object_list, page.has_other_pages()
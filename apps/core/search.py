@@ -0,0 +1,308 @@
+"""
+Full-text product search for VerzendConnect.
+
+PostgreSQL keeps a weighted tsvector column (core_product.search_vector, GIN
+indexed) with Dutch and English stemming. SQLite (development and tests)
+uses an FTS5 table (core_product_fts) with the porter stemmer instead. Both
+cover the product name, category name, short description and description,
+and are kept up to date by the signal handlers in signals.py.
+"""
+import hashlib
+import re
+import unicodedata
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from .cache import get_version, CATALOGUE_VERSION_KEY
+
+# Text search configuration per language in settings.LANGUAGES
+SEARCH_CONFIGS = {
+    'nl': 'dutch',
+    'en': 'english',
+}
+
+# Indexed columns with their PostgreSQL rank weight
+SEARCH_FIELDS = [
+    ('p.name', 'A'),
+    ('c.name', 'B'),
+    ('p.short_description', 'C'),
+    ('p.description', 'D'),
+]
+
+# SQLite bm25 weights, in FTS5 column order (name, category, short_description, description)
+FTS5_WEIGHTS = '10.0, 5.0, 2.0, 1.0'
+
+# Accented letters folded in the PostgreSQL index, matching normalize() for queries
+# (the SQLite FTS5 tokenizer removes diacritics itself)
+ACCENTED_LETTERS = 'áàâäãåéèêëíìîïóòôöõúùûüýÿçñÁÀÂÄÃÅÉÈÊËÍÌÎÏÓÒÔÖÕÚÙÛÜÝÇÑ'
+PLAIN_LETTERS = 'aaaaaaeeeeiiiiooooouuuuyycnAAAAAAEEEEIIIIOOOOOUUUUYCN'
+
+SEARCH_CACHE_TIMEOUT = 60 * 15
+SEARCH_CACHE_HITS_KEY = 'search-cache:hits'
+SEARCH_CACHE_MISSES_KEY = 'search-cache:misses'
+
+
+def normalize(text):
+    """Lowercase text with accents removed and whitespace collapsed."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ' '.join(''.join(char for char in text if not unicodedata.combining(char)).split())
+
+
+def search_terms(query):
+    """Split a search query into lowercase, accent-free words."""
+    return re.findall(r'[^\W_]+', normalize(query))
+
+
+def _search_vector_sql():
+    return ' || '.join(
+        f"setweight(to_tsvector('{config}', translate(coalesce({column}, ''), "
+        f"'{ACCENTED_LETTERS}', '{PLAIN_LETTERS}')), '{weight}')"
+        for column, weight in SEARCH_FIELDS
+        for config in SEARCH_CONFIGS.values()
+    )
+
+
+def _tsquery_sql(terms):
+    """PostgreSQL tsquery expression (in every configuration) with its params, matching each term as a prefix."""
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    tsquery_sql = ' || '.join(f"to_tsquery('{config}', %s)" for config in SEARCH_CONFIGS.values())
+    return tsquery_sql, [tsquery] * len(SEARCH_CONFIGS)
+
+
+def _fts_query(terms):
+    """SQLite FTS5 query matching each term as a prefix."""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _match_sql(terms):
+    """(FROM/WHERE clause, params, rank ORDER BY clause) matching every term as a prefix."""
+    if connection.vendor == 'postgresql':
+        tsquery_sql, params = _tsquery_sql(terms)
+        return (
+            f"FROM core_product p, (SELECT {tsquery_sql} AS q) AS query "
+            "WHERE p.is_active AND p.search_vector @@ query.q",
+            params,
+            "ORDER BY ts_rank(p.search_vector, query.q) DESC, p.id",
+        )
+    return (
+        "FROM core_product_fts f JOIN core_product p ON p.id = f.rowid "
+        "WHERE core_product_fts MATCH %s AND p.is_active",
+        [_fts_query(terms)],
+        f"ORDER BY bm25(core_product_fts, {FTS5_WEIGHTS}), p.id",
+    )
+
+
+def _rank_sql(terms):
+    """(SQL expression, params) ranking the core_product row of the outer query; best match lowest."""
+    if connection.vendor == 'postgresql':
+        tsquery_sql, params = _tsquery_sql(terms)
+        return f"-ts_rank(core_product.search_vector, {tsquery_sql})", params
+    return (
+        f"(SELECT bm25(core_product_fts, {FTS5_WEIGHTS}) FROM core_product_fts "
+        "WHERE core_product_fts MATCH %s AND core_product_fts.rowid = core_product.id)",
+        [_fts_query(terms)],
+    )
+
+
+def _scan_queryset(terms):
+    # No search index for this database; fall back to a plain scan
+    from django.db.models import Q
+    from .models import Product
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(name__icontains=term) | Q(description__icontains=term) | Q(category__name__icontains=term)
+        )
+    return Product.objects.filter(condition, is_active=True)
+
+
+def search_product_ids(query, limit=None, offset=0):
+    """
+    Return the IDs of active products matching every word of the query
+    (as a prefix), best match first: all of them, or limit IDs from offset.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        ids = _scan_queryset(terms).order_by('pk').values_list('pk', flat=True)
+        return list(ids if limit is None else ids[offset:offset + limit])
+
+    match, params, ranking = _match_sql(terms)
+    sql = f"SELECT p.id {match} {ranking}"
+    if limit is not None:
+        sql += " LIMIT %s OFFSET %s"
+        params = params + [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_matches(queryset, query):
+    """
+    Narrow a product queryset to the active products matching every word of
+    the query, with a subquery on the search index.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return queryset.filter(pk__in=_scan_queryset(terms).values('pk'))
+
+    match, params, _ranking = _match_sql(terms)
+    return queryset.filter(pk__in=RawSQL(f"SELECT p.id {match}", params))
+
+
+def order_by_rank(queryset, query):
+    """Order products found with filter_matches() best match first, on a search_rank annotation."""
+    terms = search_terms(query)
+    if not terms or connection.vendor not in ('postgresql', 'sqlite'):
+        return queryset.order_by('pk')
+
+    rank, params = _rank_sql(terms)
+    return queryset.annotate(search_rank=RawSQL(rank, params)).order_by('search_rank', 'pk')
+
+
+def count_matches(query):
+    """Number of active products search_product_ids() finds for the query."""
+    terms = search_terms(query)
+    if not terms:
+        return 0
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return _scan_queryset(terms).count()
+
+    match, params, _ranking = _match_sql(terms)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) {match}", params)
+        return cursor.fetchone()[0]
+
+
+def index_products(product_ids=None):
+    """(Re)index the given products, or all products when product_ids is None."""
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            sql = (
+                f"UPDATE core_product AS p SET search_vector = {_search_vector_sql()} "
+                "FROM core_category AS c WHERE c.id = p.category_id"
+            )
+            if product_ids is None:
+                cursor.execute(sql)
+            else:
+                cursor.execute(sql + " AND p.id = ANY(%s)", [product_ids])
+        elif connection.vendor == 'sqlite':
+            sql = (
+                "INSERT INTO core_product_fts (rowid, name, category, short_description, description) "
+                "SELECT p.id, p.name, c.name, p.short_description, p.description "
+                "FROM core_product p JOIN core_category c ON c.id = p.category_id"
+            )
+            if product_ids is None:
+                cursor.execute("DELETE FROM core_product_fts")
+                cursor.execute(sql)
+            else:
+                placeholders = ', '.join(['%s'] * len(product_ids))
+                cursor.execute(f"DELETE FROM core_product_fts WHERE rowid IN ({placeholders})", product_ids)
+                cursor.execute(f"{sql} WHERE p.id IN ({placeholders})", product_ids)
+
+
+def unindex_products(product_ids):
+    """Remove deleted products from the index (the PostgreSQL column goes with the row)."""
+    product_ids = list(product_ids)
+    if product_ids and connection.vendor == 'sqlite':
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM core_product_fts WHERE rowid IN ({placeholders})", product_ids)
+
+
+class RankedResults:
+    """
+    Products for an ordered list of IDs, loaded per slice with one in_bulk
+    query so a paginator only fetches the page it shows.
+    """
+
+    def __init__(self, ids, queryset):
+        self.ids = list(ids)
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            ids = self.ids[index]
+            products = self.queryset.in_bulk(ids)
+            return [products[pk] for pk in ids if pk in products]
+        return self[index:index + 1][0]
+
+
+class SearchPage:
+    """
+    Search results of which only one page of product IDs is known, laid out
+    at its offset in a sequence of all results so a paginator can slice it.
+    """
+
+    def __init__(self, ids, count, offset, queryset):
+        self.ids = ids
+        self.count = count
+        self.offset = offset
+        self.queryset = queryset
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = (index.start or 0) - self.offset
+        stop = (self.count if index.stop is None else index.stop) - self.offset
+        return RankedResults(self.ids[max(start, 0):max(stop, 0)], self.queryset)[:]
+
+
+def _count(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        pass
+
+
+def search_cache_stats():
+    """Hit and miss counters of the search result cache."""
+    return {
+        'hits': cache.get(SEARCH_CACHE_HITS_KEY, 0),
+        'misses': cache.get(SEARCH_CACHE_MISSES_KEY, 0),
+    }
+
+
+def cached_search_page(query, language, page, per_page):
+    """
+    Return (product_ids, count) for one page of ranked search results. Only
+    the page itself is fetched from the index; pages and the total count are
+    cached by normalized query (pages also by language and page number),
+    until the catalogue version changes.
+    """
+    normalized = normalize(query)
+    digest = hashlib.md5(normalized.encode()).hexdigest()
+    version = get_version(CATALOGUE_VERSION_KEY)
+    key = f'search:{version}:{language}:{per_page}:{page}:{digest}'
+    result = cache.get(key)
+    if result is None:
+        _count(SEARCH_CACHE_MISSES_KEY)
+        count_key = f'search-count:{version}:{digest}'
+        count = cache.get(count_key)
+        if count is None:
+            count = count_matches(normalized)
+            cache.set(count_key, count, SEARCH_CACHE_TIMEOUT)
+        offset = (page - 1) * per_page
+        ids = search_product_ids(normalized, limit=per_page, offset=offset) if offset < count else []
+        result = (ids, count)
+        cache.set(key, result, SEARCH_CACHE_TIMEOUT)
+    else:
+        _count(SEARCH_CACHE_HITS_KEY)
+    return result
@@ -0,0 +1,139 @@
+"""
+Signal handlers keeping data derived from the catalogue (caches, denormalized
+fields, the search index, the rental availability ledger) up to date.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from .cache import bump_version, catalogue_changed, NAVIGATION_VERSION_KEY
+from .home import home_sections_changed
+from .models import Category, EventType, Product, ProductImage, RentalAvailability, RentalRecord
+from .search import index_products, unindex_products
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=EventType)
+@receiver(post_delete, sender=EventType)
+def navigation_changed(sender, **kwargs):
+    """Rebuild the cached navigation tree after categories or event types change."""
+    transaction.on_commit(lambda: bump_version(NAVIGATION_VERSION_KEY))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    """Keep the product's primary image pointer, URL and dimensions current."""
+    Product.objects.refresh_primary_image(instance.product_id)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """Keep the full-text search index current."""
+    index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    unindex_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    """The category name is part of each product's search document."""
+    index_products(instance.products.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalogue_updated(sender, **kwargs):
+    """Invalidate caches built from the catalogue (typeahead index, search results)."""
+    catalogue_changed()
+
+
+def _refresh_category_counts(*category_ids):
+    """Recount the given categories and all their ancestors."""
+    paths = Category.objects.filter(pk__in=[pk for pk in category_ids if pk]).values_list('path', flat=True)
+    Category.objects.refresh_product_counts_along(*paths)
+    # The home page shows the counts
+    home_sections_changed('featured_categories')
+
+
+@receiver(pre_save, sender=Product)
+def remember_counted_state(sender, instance, **kwargs):
+    """Remember the stored category and active flag to see what a save changes."""
+    instance._counted_state = None
+    if instance.pk:
+        instance._counted_state = Product.objects.filter(pk=instance.pk).values_list(
+            'category_id', 'is_active'
+        ).first()
+
+
+@receiver(post_save, sender=Product)
+def product_counts_saved(sender, instance, created, **kwargs):
+    """Keep the active product counts of categories and event types current."""
+    previous = getattr(instance, '_counted_state', None)
+    if previous == (instance.category_id, instance.is_active):
+        return
+    _refresh_category_counts(instance.category_id, previous[0] if previous else None)
+    if not created:
+        EventType.objects.refresh_product_counts(instance.event_types.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Product)
+def remember_counted_relations(sender, instance, **kwargs):
+    # The event type links are gone by post_delete
+    instance._counted_event_types = list(instance.event_types.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def product_counts_deleted(sender, instance, **kwargs):
+    _refresh_category_counts(instance.category_id)
+    EventType.objects.refresh_product_counts(getattr(instance, '_counted_event_types', []))
+
+
+@receiver(m2m_changed, sender=Product.event_types.through)
+def product_event_types_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recount event types when products are linked to or unlinked from them."""
+    if action == 'pre_clear':
+        if reverse:
+            instance._counted_event_types = [instance.pk]
+        else:
+            instance._counted_event_types = list(instance.event_types.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        EventType.objects.refresh_product_counts(getattr(instance, '_counted_event_types', []))
+    elif action in ('post_add', 'post_remove'):
+        EventType.objects.refresh_product_counts([instance.pk] if reverse else pk_set)
+
+
+@receiver(post_save, sender=EventType)
+@receiver(post_delete, sender=EventType)
+def event_type_home_section_changed(sender, **kwargs):
+    home_sections_changed('event_types')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_home_sections_changed(sender, **kwargs):
+    # Product cards show the category name
+    home_sections_changed('featured_categories', 'featured_products', 'latest_products')
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_home_sections_changed(sender, **kwargs):
+    home_sections_changed('featured_products', 'latest_products')
+
+
+@receiver(post_delete, sender=RentalRecord)
+def rental_record_deleted(sender, instance, **kwargs):
+    """Release the days of deleted rentals, also when an order or product delete cascades."""
+    reservation = instance.reservation()
+    if reservation:
+        RentalAvailability.release(*reservation)
@@ -123,8 +123,8 @@ def product_schema(product):
     }
     
     # Add images
-    if product.primary_image and product.primary_image.image:
-        img_url = product.primary_image.image.url
+    if product.primary_image_url:
+        img_url = product.primary_image_url
         if not img_url.startswith('http'):
             img_url = urljoin(site_url, img_url)
         schema["image"].append(img_url)
@@ -0,0 +1,308 @@
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from django.db.models.expressions import RawSQL
+from django.test import TestCase
+from apps.orders.models import Order, OrderItem
+from .models import Category, EventType, Product, RentalAvailability, RentalRecord
+from .pagination import KeysetPaginator
+from .search import search_product_ids
+
+
+class RentalAvailabilityLedgerTests(TestCase):
+    """The availability ledger follows rental records through edits and deletes."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Tenten')
+        self.product = Product.objects.create(
+            name='Partytent', description='Tent', price=Decimal('50.00'), category=category, stock=5
+        )
+
+    def reserved(self, product=None):
+        return dict(
+            RentalAvailability.objects.filter(product=product or self.product).values_list('day', 'reserved')
+        )
+
+    def create_rental(self, **fields):
+        fields = {
+            'product': self.product,
+            'quantity': 2,
+            'rental_start_date': date(2030, 6, 1),
+            'return_date': date(2030, 6, 3),
+            **fields,
+        }
+        return RentalRecord.objects.create(**fields)
+
+    def test_create_reserves_period(self):
+        self.create_rental()
+        self.assertEqual(self.reserved(), {date(2030, 6, 1): 2, date(2030, 6, 2): 2, date(2030, 6, 3): 2})
+
+    def test_editing_dates_and_quantity_moves_reservation(self):
+        rental = self.create_rental()
+        rental.rental_start_date = date(2030, 6, 3)
+        rental.return_date = date(2030, 6, 4)
+        rental.quantity = 1
+        rental.save()
+        self.assertEqual(self.reserved(), {date(2030, 6, 3): 1, date(2030, 6, 4): 1})
+
+    def test_editing_product_moves_reservation(self):
+        other = Product.objects.create(
+            name='Statafel', description='Tafel', price=Decimal('10.00'), category=self.product.category, stock=5
+        )
+        rental = self.create_rental()
+        rental.product = other
+        rental.save()
+        self.assertEqual(self.reserved(), {})
+        self.assertEqual(len(self.reserved(other)), 3)
+
+    def test_saving_unchanged_record_keeps_reservation(self):
+        rental = self.create_rental()
+        rental.notes = 'Bezorgen achterom'
+        rental.save()
+        self.assertEqual(set(self.reserved().values()), {2})
+
+    def test_mark_returned_releases_once(self):
+        rental = self.create_rental()
+        self.create_rental(quantity=1)
+        rental.mark_returned()
+        rental.mark_returned()
+        rental.save()
+        self.assertEqual(set(self.reserved().values()), {1})
+
+    def test_delete_releases_reservation(self):
+        rental = self.create_rental()
+        rental.delete()
+        self.assertEqual(self.reserved(), {})
+
+    def test_deleting_returned_record_keeps_other_reservations(self):
+        rental = self.create_rental()
+        self.create_rental(quantity=1)
+        rental.mark_returned()
+        rental.delete()
+        self.assertEqual(set(self.reserved().values()), {1})
+
+    def test_order_delete_cascade_releases_reservation(self):
+        order = Order.objects.create(
+            email='klant@example.com', shipping_first_name='Jan', shipping_last_name='Jansen',
+            shipping_address='Dorpsstraat 1', shipping_city='Utrecht', shipping_postal_code='1234 AB',
+            subtotal=Decimal('100.00'), total=Decimal('100.00')
+        )
+        order_item = OrderItem.objects.create(
+            order=order, product=self.product, product_name=self.product.name, quantity=2,
+            price=Decimal('50.00'), total=Decimal('100.00'),
+            rental_start_date=date(2030, 6, 1), rental_end_date=date(2030, 6, 3)
+        )
+        self.create_rental(order_item=order_item)
+        order.delete()
+        self.assertEqual(self.reserved(), {})
+
+
+class MaintainedCountTests(TestCase):
+    """Saving an outdated instance does not undo the maintained columns."""
+
+    def test_stale_category_and_event_type_saves_keep_counts(self):
+        parent = Category.objects.create(name='Meubilair')
+        category = Category.objects.create(name='Stoelen', parent=parent)
+        event_type = EventType.objects.create(name='Bruiloft')
+        stale_category = Category.objects.get(pk=category.pk)
+        stale_event_type = EventType.objects.get(pk=event_type.pk)
+
+        product = Product.objects.create(
+            name='Klapstoel', description='Stoel', price=Decimal('2.50'), category=category, stock=10
+        )
+        product.event_types.add(event_type)
+
+        stale_category.name = 'Stoelen en krukken'
+        stale_category.save()
+        stale_event_type.save()
+        category.refresh_from_db()
+        event_type.refresh_from_db()
+        self.assertEqual(category.name, 'Stoelen en krukken')
+        self.assertEqual(category.product_count, 1)
+        self.assertEqual(category.path, f'{parent.path}{category.pk}/')
+        self.assertEqual(event_type.product_count, 1)
+
+    def test_moving_a_category_still_updates_its_path(self):
+        old_parent = Category.objects.create(name='Meubilair')
+        new_parent = Category.objects.create(name='Verhuur')
+        category = Category.objects.create(name='Stoelen', parent=old_parent)
+        category.parent = new_parent
+        category.save()
+        category.refresh_from_db()
+        self.assertEqual(category.path, f'{new_parent.path}{category.pk}/')
+        self.assertEqual(category.depth, 1)
+
+
+class CheckAvailabilityTests(TestCase):
+    """Product.objects.check_availability counts every line of a cart together."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Tenten')
+        self.tent = Product.objects.create(
+            name='Partytent', description='Tent', price=Decimal('50.00'), category=category, stock=5
+        )
+        self.garland = Product.objects.create(
+            name='Slinger', description='Slinger', price=Decimal('5.00'), category=category,
+            stock=5, selling_type=Product.SELLING_TYPE_SELLING
+        )
+        RentalRecord.objects.create(
+            product=self.tent, quantity=2, rental_start_date=date(2030, 6, 1), return_date=date(2030, 6, 3)
+        )
+
+    def test_lines_of_one_rental_share_its_capacity(self):
+        with self.assertNumQueries(2):
+            results = Product.objects.check_availability([
+                (self.tent.pk, date(2030, 6, 1), date(2030, 6, 3), 2),
+                (self.tent.pk, date(2030, 6, 3), date(2030, 6, 5), 2),
+                (self.tent.pk, date(2030, 6, 4), date(2030, 6, 6), 3),
+            ])
+        self.assertEqual(results, [
+            (True, "Available"),
+            # 3 June already holds 2 reserved and 2 claimed units of the 5
+            (False, "Only 1 items available for this period"),
+            (True, "Available"),
+        ])
+
+    def test_lines_of_one_selling_product_share_its_stock(self):
+        results = Product.objects.check_availability([
+            (self.garland.pk, None, None, 3),
+            (self.garland.pk, None, None, 3),
+            (self.garland.pk, None, None, 2),
+        ])
+        self.assertEqual(results, [
+            (True, "Available"),
+            (False, "Only 5 items in stock"),
+            (True, "Available"),
+        ])
+
+    def test_unknown_products_and_missing_dates(self):
+        results = Product.objects.check_availability([
+            (0, None, None, 1),
+            (self.tent.pk, None, None, 1),
+        ])
+        self.assertEqual(results, [
+            (False, "Product not found"),
+            (False, "Rental dates are required for rental products"),
+        ])
+
+
+class ProductListSearchTests(TestCase):
+    """The product list filters and ranks search matches in the database."""
+
+    def setUp(self):
+        self.tents = Category.objects.create(name='Tenten')
+        chairs = Category.objects.create(name='Stoelen')
+        self.products = [
+            Product.objects.create(
+                name=name, description=description, price=Decimal('10.00'), category=category, stock=1
+            )
+            for name, description, category in [
+                ('Statafel', 'Tafel met hoes, past bij de tent', chairs),
+                ('Partytent', 'Tent van 3 bij 6 meter, tent met zijwanden', self.tents),
+                ('Klapstoel', 'Witte stoel', chairs),
+                ('Tentverwarming', 'Heater voor in de tent', self.tents),
+            ]
+        ]
+
+    def test_search_is_ranked_and_filtered(self):
+        response = self.client.get('/products/', {'search': 'tent'})
+        ranked = search_product_ids('tent')
+        self.assertEqual(len(ranked), 3)
+        self.assertEqual([product.pk for product in response.context['products']], ranked)
+
+        response = self.client.get('/products/', {'search': 'tent', 'category': self.tents.slug})
+        self.assertEqual(
+            [product.pk for product in response.context['products']],
+            [pk for pk in ranked if pk in (self.products[1].pk, self.products[3].pk)]
+        )
+        facets = {category.pk: category.facet_count for category in response.context['categories']}
+        self.assertEqual(facets, {self.tents.pk: 2, self.products[0].category_id: 1})
+
+
+class KeysetPaginatorTests(TestCase):
+    """Keyset cursors walk a list both ways without skipping or repeating rows."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Decoratie')
+        # Several products share a price, so pages break inside runs of equal sort values
+        self.products = [
+            Product.objects.create(
+                name=f'Product {index}', description='Decoratie', price=Decimal(price), category=category, stock=1
+            )
+            for index, price in enumerate(['5.00', '5.00', '5.00', '5.00', '10.00', '10.00', '20.00', '20.00'])
+        ]
+        self.paginator = KeysetPaginator(Product.objects.order_by('effective_price'), 3, approximate_count=False)
+
+    def pks(self, page):
+        return [product.pk for product in page]
+
+    def test_next_pages_cover_every_row_once(self):
+        page = self.paginator.page()
+        seen = self.pks(page)
+        self.assertFalse(page.has_previous())
+        while page.has_next():
+            page = self.paginator.page(page.next_cursor)
+            seen += self.pks(page)
+        self.assertEqual(seen, [product.pk for product in self.products])
+        self.assertEqual(self.paginator.count, 8)
+
+    def test_previous_returns_to_the_first_page(self):
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertFalse(third.has_next())
+
+        back = self.paginator.page(third.previous_cursor)
+        self.assertEqual(self.pks(back), self.pks(second))
+        back = self.paginator.page(back.previous_cursor)
+        self.assertEqual(self.pks(back), self.pks(first))
+        self.assertFalse(back.has_previous())
+        self.assertEqual(self.pks(self.paginator.page(back.next_cursor)), self.pks(second))
+
+    def test_descending_order_with_equal_timestamps(self):
+        Product.objects.update(created_at=self.products[0].created_at)
+        paginator = KeysetPaginator(Product.objects.order_by('-created_at'), 3)
+        page = paginator.page()
+        seen = self.pks(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            seen += self.pks(page)
+        self.assertEqual(seen, sorted((product.pk for product in self.products), reverse=True))
+
+    def test_cursor_records_direction(self):
+        product = self.products[4]
+        self.assertEqual(
+            self.paginator.decode_cursor(self.paginator.encode_cursor(product)),
+            (True, [Decimal('10.00'), product.pk])
+        )
+        self.assertEqual(
+            self.paginator.decode_cursor(self.paginator.encode_cursor(product, forward=False)),
+            (False, [Decimal('10.00'), product.pk])
+        )
+
+    def test_invalid_cursors_fall_back_to_the_first_page(self):
+        def encode(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+        first = self.pks(self.paginator.page())
+        for cursor in [
+            'garbage',
+            '!!!',
+            encode(['not', 'a', 'cursor']),
+            encode({'o': ['name', 'id'], 'd': 'n', 'v': ['Product 1', 1]}),
+            encode({'o': ['effective_price', 'id'], 'd': 'n', 'v': ['cheap', 'x']}),
+        ]:
+            self.assertEqual(self.pks(self.paginator.page(cursor)), first, cursor)
+
+        response = self.client.get('/products/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['page_obj'].keyset)
+
+    def test_only_plain_non_null_orderings_are_supported(self):
+        self.assertTrue(KeysetPaginator.supports(Product.objects.order_by('-effective_price')))
+        self.assertFalse(KeysetPaginator.supports(Product.objects.order_by('rental_start_date')))
+        self.assertFalse(KeysetPaginator.supports(Product.objects.order_by('category__name')))
+        self.assertFalse(KeysetPaginator.supports(
+            Product.objects.annotate(rank=RawSQL('1', [])).order_by('rank')
+        ))
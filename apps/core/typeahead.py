@@ -0,0 +1,149 @@
+"""
+In-process typeahead index for the live search API.
+
+Every worker keeps the active products (name, URL, price, image URL and
+category) in memory, with a sorted word list for prefix lookups. The index
+loads on first use. When the shared catalogue version changes it reloads
+only the products updated since shortly before the last load, so
+autocomplete requests are answered without a database query.
+"""
+import bisect
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import translation
+from .cache import get_version, CATALOGUE_VERSION_KEY
+from .models import Product, Category
+from .search import normalize, search_terms
+
+# Seconds between checks of the shared catalogue version
+VERSION_CHECK_INTERVAL = 2
+
+# Seconds of product updates re-read on every incremental load: a product
+# saved in a transaction that commits after a later-stamped product was
+# loaded still has its update picked up
+RELOAD_OVERLAP = 60 * 5
+
+PLACEHOLDER_IMAGE = '/static/images/placeholder.svg'
+
+
+class TypeaheadIndex:
+    """Prefix index over active products, shared by all requests of a worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (entries by product id, sorted (word, product id) list), swapped as a whole
+        self._data = None
+        self._version = None
+        self._checked = 0
+        self._products_seen = None
+        self._categories_seen = None
+
+    def _entry(self, product):
+        urls = {}
+        for language, _name in settings.LANGUAGES:
+            with translation.override(language):
+                urls[language] = product.get_absolute_url()
+        return {
+            'id': product.id,
+            'name': product.name,
+            'price': str(product.current_price),
+            'urls': urls,
+            'image': product.primary_image_url or PLACEHOLDER_IMAGE,
+            'category': product.category.name,
+            'sort_name': normalize(product.name),
+            'words': set(search_terms(f'{product.name} {product.category.name}')),
+        }
+
+    def _load(self):
+        """Load all active products, or only those changed since the last load."""
+        categories_seen = Category.objects.order_by('-updated_at').values_list('updated_at', flat=True).first()
+        full = self._data is None or categories_seen != self._categories_seen
+
+        products = Product.objects.select_related('category').only(
+            'id', 'name', 'slug', 'price', 'sale_price', 'primary_image_url', 'is_active',
+            'updated_at', 'category__name'
+        )
+        if full:
+            entries = {}
+            changed = products.filter(is_active=True)
+        else:
+            entries = dict(self._data[0])
+            changed = products.filter(updated_at__gte=self._products_seen - timedelta(seconds=RELOAD_OVERLAP))
+
+        products_seen = self._products_seen
+        for product in changed:
+            if product.is_active:
+                entries[product.id] = self._entry(product)
+            else:
+                entries.pop(product.id, None)
+            if products_seen is None or product.updated_at > products_seen:
+                products_seen = product.updated_at
+
+        if not full:
+            # Drop deleted products
+            active_ids = set(Product.objects.filter(is_active=True).values_list('pk', flat=True))
+            for product_id in set(entries) - active_ids:
+                del entries[product_id]
+
+        words = sorted((word, product_id) for product_id, entry in entries.items() for word in entry['words'])
+        self._data = (entries, words)
+        self._products_seen, self._categories_seen = products_seen, categories_seen
+
+    def refresh(self):
+        """Bring the index up to date if the catalogue version changed."""
+        now = time.monotonic()
+        if self._data is not None and self._checked + VERSION_CHECK_INTERVAL > now:
+            return
+        version = get_version(CATALOGUE_VERSION_KEY)
+        with self._lock:
+            if self._data is None or version != self._version:
+                self._load()
+                self._version = version
+            self._checked = now
+
+    @staticmethod
+    def _prefix_ids(words, prefix):
+        ids = set()
+        i = bisect.bisect_left(words, (prefix,))
+        while i < len(words) and words[i][0].startswith(prefix):
+            ids.add(words[i][1])
+            i += 1
+        return ids
+
+    def search(self, query, limit=10):
+        """Return up to limit products whose words start with every query word."""
+        self.refresh()
+        entries, words = self._data
+        terms = search_terms(query)
+        if not terms:
+            return []
+        ids = None
+        for term in sorted(terms, key=len, reverse=True):
+            matches = self._prefix_ids(words, term)
+            ids = matches if ids is None else ids & matches
+            if not ids:
+                return []
+
+        language = translation.get_language() or settings.LANGUAGE_CODE
+        phrase = normalize(query.strip())
+        matches = sorted(
+            (entries[product_id] for product_id in ids),
+            # Names starting with the query first, then alphabetical
+            key=lambda entry: (not entry['sort_name'].startswith(phrase), entry['sort_name'])
+        )
+        return [
+            {
+                'id': entry['id'],
+                'name': entry['name'],
+                'price': entry['price'],
+                'url': entry['urls'].get(language, entry['urls'][settings.LANGUAGE_CODE]),
+                'image': entry['image'],
+                'category': entry['category'],
+            }
+            for entry in matches[:limit]
+        ]
+
+
+typeahead_index = TypeaheadIndex()
@@ -19,6 +19,7 @@ urlpatterns = [
         path('services/', views.ServicesView.as_view(), name='services'),
         path('support/', views.SupportView.as_view(), name='support'),
         path('support/return/<int:support_id>/', views.SupportReturnView.as_view(), name='support_return'),
+        path('support/status/<int:support_id>/', views.SupportStatusView.as_view(), name='support_status'),
         path('support/qr-code/', views.generate_qr_code, name='support_qr_code'),
     path('products/', views.ProductListView.as_view(), name='product_list'),
     path('product/<slug:slug>/', views.ProductDetailView.as_view(), name='product_detail'),
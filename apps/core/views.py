@@ -4,13 +4,17 @@ Core views for VerzendConnect.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import TemplateView, ListView, DetailView
 from django.views import View
-from django.db.models import Q
 from django.http import JsonResponse, HttpResponseRedirect, HttpResponse
+from django.urls import reverse
 from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.utils import translation
 from django.contrib import messages
 from .models import Product, Category, EventType, SiteSettings, FAQ, RentalTerms, Services
+from .search import cached_search_page, filter_matches, order_by_rank, SearchPage
+from .facets import product_facets, parse_price
+from .home import get_home_sections
+from .pagination import KeysetPaginationMixin
 
 
 def robots_txt(request):
@@ -101,70 +105,112 @@ class HomeView(TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['event_types'] = EventType.objects.filter(is_active=True)[:6]
-        context['featured_categories'] = Category.objects.filter(
-            is_active=True, 
-            parent__isnull=True
-        ).prefetch_related('products')[:6]
-        context['featured_products'] = Product.objects.filter(
-            is_active=True, 
-            is_featured=True
-        ).select_related('category')[:8]
-        context['latest_products'] = Product.objects.filter(
-            is_active=True
-        ).select_related('category').order_by('-created_at')[:8]
+        # Every section comes from the cache, rebuilt in the background (see home.py)
+        context.update(get_home_sections())
         return context
 
 
-class ProductListView(ListView):
+class ProductListView(KeysetPaginationMixin, ListView):
     """Product listing page with filters."""
     model = Product
     template_name = 'core/product_list.html'
     context_object_name = 'products'
     paginate_by = 12
     
-    def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).select_related('category')
+    def get_filters(self):
+        """Active filter values from the query string."""
+        return {
+            'search': self.request.GET.get('search', '').strip(),
+            'category': self.request.GET.get('category', ''),
+            'event': self.request.GET.get('event', ''),
+            'type': self.request.GET.get('type', ''),
+            'min_price': parse_price(self.request.GET.get('min_price')),
+            'max_price': parse_price(self.request.GET.get('max_price')),
+        }
+    
+    def filter_queryset(self, exclude=None):
+        """Active products with every filter applied except the one named by exclude."""
+        queryset = Product.objects.listed()
+        filters = self.filters
         
         # Search
-        search = self.request.GET.get('search', '')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search)
-            )
+        if filters['search'] and exclude != 'search':
+            queryset = filter_matches(queryset, filters['search'])
         
-        # Category filter
-        category_slug = self.request.GET.get('category')
-        if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
+        # Category filter, including the products of all subcategories
+        if filters['category'] and exclude != 'category':
+            if self.category is None:
+                return queryset.none()
+            queryset = queryset.in_category(self.category)
         
         # Event type filter
-        event_slug = self.request.GET.get('event')
-        if event_slug:
-            queryset = queryset.filter(event_types__slug=event_slug)
+        if filters['event'] and exclude != 'event':
+            queryset = queryset.for_event_type(filters['event'])
+        
+        # Selling type filter
+        if filters['type'] in dict(Product.SELLING_TYPE_CHOICES) and exclude != 'type':
+            queryset = queryset.filter(selling_type=filters['type'])
+        
+        # Price range on the stored effective price (both bounds inclusive)
+        if exclude != 'price':
+            if filters['min_price'] is not None:
+                queryset = queryset.filter(effective_price__gte=filters['min_price'])
+            if filters['max_price'] is not None:
+                queryset = queryset.filter(effective_price__lte=filters['max_price'])
+        
+        return queryset
+    
+    def get_queryset(self):
+        self.filters = self.get_filters()
+        self.category = None
+        if self.filters['category']:
+            self.category = Category.objects.filter(slug=self.filters['category']).only('path').first()
+        queryset = self.filter_queryset()
         
         # Sorting
         sort = self.request.GET.get('sort', '')
         if sort == 'price_asc':
-            queryset = queryset.order_by('price')
+            queryset = queryset.order_by('effective_price')
         elif sort == 'price_desc':
-            queryset = queryset.order_by('-price')
-        elif sort == 'name_asc':
+            queryset = queryset.order_by('-effective_price')
+        elif sort in ('name', 'name_asc'):
             queryset = queryset.order_by('name')
         elif sort == 'name_desc':
             queryset = queryset.order_by('-name')
         elif sort == '-created_at':
             queryset = queryset.order_by('-created_at')
+        elif self.filters['search']:
+            # Best matches first, ranked by the database
+            queryset = order_by_rank(queryset, self.filters['search'])
         else:
             queryset = queryset.order_by('-created_at')
         
-        return queryset.distinct()
+        return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.filter(is_active=True, parent__isnull=True)
-        context['event_types'] = EventType.objects.filter(is_active=True)
+        facets = product_facets(self.filter_queryset, self.filters)
+        
+        categories = list(Category.objects.filter(is_active=True, parent__isnull=True))
+        for category in categories:
+            category.facet_count = facets['categories'].get(category.id, 0)
+        event_types = list(EventType.objects.filter(is_active=True))
+        for event_type in event_types:
+            event_type.facet_count = facets['event_types'].get(event_type.id, 0)
+        
+        context['categories'] = categories
+        context['event_types'] = event_types
+        context['selling_type_facets'] = [
+            {'value': value, 'label': label, 'count': facets['selling_types'].get(value, 0)}
+            for value, label in Product.SELLING_TYPE_CHOICES
+        ]
+        context['price_band_facets'] = facets['price_bands']
+        context['current_category'] = self.filters['category']
+        context['current_event'] = self.filters['event']
+        context['current_type'] = self.filters['type']
+        context['current_min_price'] = self.filters['min_price']
+        context['current_max_price'] = self.filters['max_price']
+        context['current_sort'] = self.request.GET.get('sort', '')
         return context
 
 
@@ -182,9 +228,8 @@ class ProductDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         product = self.object
-        context['related_products'] = Product.objects.filter(
-            category=product.category,
-            is_active=True
+        context['related_products'] = Product.objects.listed().filter(
+            category=product.category
         ).exclude(id=product.id)[:4]
         
         # Breadcrumb items for structured data
@@ -211,10 +256,7 @@ class CategoryDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         category = self.object
-        context['products'] = Product.objects.filter(
-            category=category,
-            is_active=True
-        ).select_related('category')
+        context['products'] = Product.objects.listed().in_category(category)
         context['subcategories'] = category.subcategories.filter(is_active=True)
         return context
 
@@ -233,10 +275,7 @@ class EventTypeDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         event_type = self.object
-        context['products'] = Product.objects.filter(
-            event_types=event_type,
-            is_active=True
-        ).select_related('category')
+        context['products'] = Product.objects.listed().for_event_type(event_type)
         return context
 
 
@@ -252,11 +291,15 @@ class SearchView(ListView):
         if not query:
             return Product.objects.none()
         
-        return Product.objects.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(category__name__icontains=query)
-        ).filter(is_active=True).distinct()
+        queryset = Product.objects.listed()
+        page = self.request.GET.get(self.page_kwarg) or '1'
+        if not page.isdigit() or int(page) < 1:
+            return order_by_rank(filter_matches(queryset, query), query)
+        
+        # One cached page of ranked IDs, hydrated with a single in_bulk query
+        page = int(page)
+        ids, count = cached_search_page(query, translation.get_language(), page, self.paginate_by)
+        return SearchPage(ids, count, (page - 1) * self.paginate_by, queryset)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -395,17 +438,17 @@ class SupportReturnView(View):
     
     def get(self, request, support_id):
         from apps.payments.models import Support
-        from apps.payments.services import MollieService
+        from apps.payments.services import PENDING_PAYMENT_STATUSES
         
+        # The webhook has usually updated the status by now
         support = get_object_or_404(Support, id=support_id)
         
-        # Update payment status from Mollie
-        if support.mollie_payment_id:
-            mollie_service = MollieService()
-            try:
-                support = mollie_service.update_support_status(support)
-            except Exception as e:
-                print(f"Error updating support status: {e}")
+        if support.mollie_payment_id and support.status in PENDING_PAYMENT_STATUSES:
+            # Wait for the webhook on a page polling SupportStatusView
+            return render(request, 'payments/payment_pending.html', {
+                'support': support,
+                'status_url': reverse('core:support_status', kwargs={'support_id': support.id}),
+            })
         
         context = {
             'support': support,
@@ -413,6 +456,21 @@ class SupportReturnView(View):
         return render(request, self.template_name, context)
 
 
+class SupportStatusView(View):
+    """Local status of a support payment, polled by the pending page."""
+    
+    def get(self, request, support_id):
+        from apps.payments.models import Support
+        from apps.payments.services import refresh_returned_status, PENDING_PAYMENT_STATUSES
+        
+        support = get_object_or_404(Support, id=support_id)
+        support = refresh_returned_status('support', support)
+        return JsonResponse({
+            'status': support.status,
+            'pending': support.status in PENDING_PAYMENT_STATUSES,
+        })
+
+
 def generate_qr_code(request):
     """Generate QR code for support page URL."""
     import qrcode
@@ -12,6 +12,7 @@ from datetime import timedelta
 from apps.orders.models import Order
 from apps.core.models import Product, Category, ProductImage, EventType, RentalRecord, FAQ, RentalTerms, Services, SiteSettings, Costs
 from apps.accounts.models import CustomUser
+from apps.core.pagination import KeysetPaginationMixin
 from .forms import CompanyInfoForm
 
 
@@ -113,11 +114,7 @@ class DashboardView(SuperuserRequiredMixin, TemplateView):
         ).order_by('-order_count')[:5]
         
         # Top Categories
-        context['top_categories'] = Category.objects.filter(
-            is_active=True
-        ).annotate(
-            product_count=Count('products')
-        ).order_by('-product_count')[:5]
+        context['top_categories'] = Category.objects.filter(is_active=True).order_by('-product_count')[:5]
         
         return context
 
@@ -169,7 +166,7 @@ class ReportsView(SuperuserRequiredMixin, TemplateView):
 
 
 # Product Management Views
-class ProductListView(SuperuserRequiredMixin, ListView):
+class ProductListView(SuperuserRequiredMixin, KeysetPaginationMixin, ListView):
     """List all products for admin management."""
     model = Product
     template_name = 'dashboard/products/list.html'
@@ -177,7 +174,7 @@ class ProductListView(SuperuserRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        queryset = Product.objects.select_related('category').prefetch_related('images')
+        queryset = Product.objects.select_related('category', 'primary_image')
         search = self.request.GET.get('search')
         if search:
             queryset = queryset.filter(
@@ -458,7 +455,7 @@ class EventTypeDeleteView(SuperuserRequiredMixin, DeleteView):
 
 
 # Order Management Views
-class OrderListView(SuperuserRequiredMixin, ListView):
+class OrderListView(SuperuserRequiredMixin, KeysetPaginationMixin, ListView):
     """List all orders for admin management."""
     model = Order
     template_name = 'dashboard/orders/list.html'
@@ -494,7 +491,7 @@ class OrderDetailView(SuperuserRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['order_items'] = self.object.items.select_related('product').all()
+        context['order_items'] = self.object.items.select_related('product__primary_image').all()
         # Get status choices from the model
         status_field = Order._meta.get_field('status')
         context['status_choices'] = status_field.choices
@@ -531,7 +528,7 @@ class OrderDetailView(SuperuserRequiredMixin, DetailView):
 
 
 # Stock Management Views
-class StockManagementView(SuperuserRequiredMixin, ListView):
+class StockManagementView(SuperuserRequiredMixin, KeysetPaginationMixin, ListView):
     """View all rental records for stock management."""
     model = RentalRecord
     template_name = 'dashboard/stock/list.html'
@@ -602,7 +599,7 @@ class RentalMarkReturnedView(SuperuserRequiredMixin, View):
             messages.warning(request, 'This rental is already marked as returned.')
         else:
             rental.mark_returned()
-            messages.success(request, f'Rental for {rental.product.name} marked as returned. Stock restored.')
+            messages.success(request, f'Rental for {rental.product.name} marked as returned. Rental period released.')
         
         # Check if it's an AJAX request
         if request.headers.get('Content-Type') == 'application/json':
@@ -1,4 +1,5 @@
 from celery import shared_task
+from celery.utils.log import get_task_logger
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
@@ -6,6 +7,8 @@ from django.utils.html import strip_tags
 from django.utils import timezone
 from datetime import timedelta
 
+logger = get_task_logger(__name__)
+
 
 def send_order_confirmation_email(order_id):
     """Send order confirmation email to customer."""
@@ -254,11 +257,14 @@ def process_returned_rentals():
     Note: In practice, admin should manually mark items as returned.
     This task can be used for reporting or cleanup.
     """
-    from apps.core.models import RentalRecord
+    from apps.core.models import RentalRecord, RentalAvailability
     
     # This is informational - actual return should be marked by admin
     today = timezone.now().date()
     
+    # Past days can no longer be booked, drop them from the availability ledger
+    RentalAvailability.objects.filter(day__lt=today).delete()
+    
     # Get rentals that should have been returned
     pending_returns = RentalRecord.objects.filter(
         is_returned=False,
@@ -268,6 +274,132 @@ def process_returned_rentals():
     return f"Found {pending_returns.count()} rentals pending return"
 
 
+@shared_task
+def purge_stale_carts():
+    """
+    Delete empty carts and guest carts whose session has expired,
+    together with the expired sessions themselves.
+    """
+    from importlib import import_module
+    from apps.orders.models import Cart
+    
+    now = timezone.now()
+    deleted = Cart.purge_stale(
+        empty_before=now - timedelta(seconds=settings.EMPTY_CART_MAX_AGE),
+        guest_before=now - timedelta(seconds=settings.SESSION_COOKIE_AGE),
+    )
+    import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
+    
+    return f"Purged {deleted} stale carts"
+
+
+@shared_task
+def reconcile_product_counts():
+    """
+    Recount the active products of every category and event type, correcting
+    counts the signal handlers missed (bulk updates, raw SQL, fixtures).
+    """
+    from apps.core.models import Category, EventType
+    
+    Category.objects.refresh_product_counts()
+    EventType.objects.refresh_product_counts()
+    
+    return "Reconciled category and event type product counts"
+
+
+@shared_task
+def refresh_home_sections(sections=None, languages=None):
+    """
+    Rebuild cached home page sections (all of them by default) in the given
+    languages (all site languages by default).
+    """
+    from apps.core.home import HOME_SECTIONS, build_section
+    
+    sections = sections or list(HOME_SECTIONS)
+    languages = languages or [code for code, _ in settings.LANGUAGES]
+    for section in sections:
+        for language in languages:
+            build_section(section, language)
+    
+    return f"Refreshed {len(sections)} home sections in {len(languages)} languages"
+
+
+@shared_task
+def refresh_payment_methods(currency='EUR'):
+    """
+    Refresh the cached Mollie payment method catalogue. On errors the cached
+    catalogue stays in use and the task fails with the error.
+    """
+    from apps.payments.services import MollieService
+    
+    try:
+        methods = MollieService().refresh_payment_methods(currency)
+    except Exception:
+        logger.exception("Failed to refresh the %s payment methods", currency)
+        raise
+    
+    return f"Refreshed {len(methods)} {currency} payment methods"
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+def process_mollie_webhook(self, kind, mollie_payment_id):
+    """
+    Fetch the status of a payment ('payment') or support payment ('support')
+    a Mollie webhook was received for and apply it. Retried while Mollie
+    cannot be reached, since the webhook itself was already acknowledged.
+    """
+    from apps.payments.services import MollieService, webhook_dequeued
+    
+    webhook_dequeued(kind, mollie_payment_id)
+    try:
+        record = MollieService().process_webhook(kind, mollie_payment_id)
+    except Exception as e:
+        print(f"Failed to process Mollie webhook for {kind} {mollie_payment_id}: {e}")
+        raise self.retry(exc=e)
+    
+    if record is None:
+        return f"No {kind} found for Mollie payment {mollie_payment_id}"
+    return f"Mollie payment {mollie_payment_id} is {record.status}"
+
+
+@shared_task
+def reconcile_pending_payments():
+    """
+    Apply the Mollie status of payments and support payments left open or
+    pending by missed webhooks, then cancel orders left unpaid for longer
+    than UNPAID_ORDER_MAX_AGE, so they stop holding stock.
+    """
+    from apps.orders.models import Order
+    from apps.payments.services import MollieService
+    
+    summaries = []
+    if settings.MOLLIE_API_KEY:
+        mollie_service = MollieService()
+        for kind in ('payment', 'support'):
+            started = timezone.now()
+            stats = mollie_service.reconcile_stale_payments(kind)
+            seconds = (timezone.now() - started).total_seconds()
+            transitions = ', '.join(
+                f"{count} {status}" for status, count in sorted(stats.items())
+                if status not in ('checked', 'changed', 'errors')
+            )
+            logger.info(
+                "Reconciled %s records: checked %d, changed %d, errors %d in %.1fs",
+                kind, stats['checked'], stats['changed'], stats['errors'], seconds,
+                extra={'reconcile': {'kind': kind, 'seconds': seconds, **stats}},
+            )
+            summaries.append(
+                f"{kind}: checked {stats['checked']}, changed {stats['changed']}"
+                f"{f' ({transitions})' if transitions else ''}, errors {stats['errors']} in {seconds:.1f}s"
+            )
+    
+    released = Order.release_abandoned(timezone.now() - timedelta(seconds=settings.UNPAID_ORDER_MAX_AGE))
+    logger.info("Cancelled %d unpaid orders", released, extra={'reconcile': {'released_orders': released}})
+    summaries.append(f"cancelled {released} unpaid orders")
+    
+    return f"Reconciled pending payments - {'; '.join(summaries)}"
+
+
 def create_rental_record(order_item):
     """
     Create a rental record when an order is placed.
@@ -0,0 +1,104 @@
+"""
+Cart summary ({count, total, version}) for rendering the header badge of
+anonymous visitors without touching the session or cart tables.
+
+The summary is written by the cart views into a signed cookie, bound to the
+session key through the signing salt so it dies with the session. A small
+process-level cache keyed by session key covers requests without a valid
+cookie; its entries expire quickly since other workers cannot invalidate them.
+"""
+import json
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from django.conf import settings
+
+COOKIE_NAME = 'cart_summary'
+
+# Bump when the stored format changes so old cookies are ignored
+SUMMARY_VERSION = 1
+
+PROCESS_CACHE_SIZE = 1000
+PROCESS_CACHE_TIMEOUT = 60
+
+_process_cache = OrderedDict()
+
+
+def _salt(session_key):
+    return f'cart-summary:{session_key}'
+
+
+def _remember(session_key, summary):
+    _process_cache[session_key] = (time.monotonic() + PROCESS_CACHE_TIMEOUT, summary)
+    _process_cache.move_to_end(session_key)
+    while len(_process_cache) > PROCESS_CACHE_SIZE:
+        _process_cache.popitem(last=False)
+
+
+def summarize(cart):
+    """Build the summary dict for a cart (None means an empty cart)."""
+    if cart is None:
+        return {'count': 0, 'total': '0.00', 'version': SUMMARY_VERSION}
+    return {
+        'count': cart.items_count,
+        'total': f'{cart.total:.2f}',
+        'version': SUMMARY_VERSION,
+    }
+
+
+def load_summary(request):
+    """
+    Return (count, total) for the anonymous visitor's cart without a database
+    query, or None when neither the cookie nor the process cache knows it.
+    """
+    session_key = request.session.session_key
+    if not session_key:
+        # No session means no cart
+        return 0, Decimal('0.00')
+
+    value = request.get_signed_cookie(COOKIE_NAME, default=None, salt=_salt(session_key))
+    summary = None
+    if value:
+        try:
+            summary = json.loads(value)
+        except ValueError:
+            summary = None
+
+    if summary is None:
+        entry = _process_cache.get(session_key)
+        if entry and entry[0] > time.monotonic():
+            summary = entry[1]
+
+    if not summary or summary.get('version') != SUMMARY_VERSION:
+        return None
+    return summary['count'], Decimal(summary['total'])
+
+
+def store_summary(request, response, cart):
+    """Write the cart summary to the response cookie and the process cache."""
+    session_key = request.session.session_key
+    if not session_key:
+        return response
+    if request.user.is_authenticated:
+        # Logged-in users read their cart from the database
+        response.delete_cookie(COOKIE_NAME)
+        return response
+    summary = summarize(cart)
+    _remember(session_key, summary)
+    response.set_signed_cookie(
+        COOKIE_NAME,
+        json.dumps(summary),
+        salt=_salt(session_key),
+        max_age=settings.SESSION_COOKIE_AGE,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite='Lax',
+    )
+    return response
+
+
+def cache_summary(request, cart):
+    """Remember a summary computed from the database for later requests."""
+    session_key = request.session.session_key
+    if session_key:
+        _remember(session_key, summarize(cart))
@@ -1,4 +1,5 @@
 from .models import Cart
+from .cart_summary import load_summary, cache_summary
 
 
 def cart_context(request):
@@ -7,12 +8,26 @@ def cart_context(request):
     cart_count = 0
     cart_total = 0
     
-    if request.user.is_authenticated:
+    if getattr(request, '_cart', None) is not None:
+        # Already loaded by the view (CartMixin); reuse its memoized totals
+        cart = request._cart
+    elif request.user.is_authenticated:
         cart = Cart.objects.filter(user=request.user).first()
-    elif request.session.session_key:
+    else:
+        # Anonymous visitors: use the cart summary cookie when it is valid
+        summary = load_summary(request)
+        if summary is not None:
+            cart_count, cart_total = summary
+            return {
+                'cart': None,
+                'cart_count': cart_count,
+                'cart_total': cart_total,
+            }
         cart = Cart.objects.filter(session_key=request.session.session_key).first()
+        cache_summary(request, cart)
     
     if cart:
+        # One aggregate query and one Costs read, memoized on the cart
         cart_count = cart.items_count
         cart_total = cart.total
     
@@ -21,4 +36,3 @@ def cart_context(request):
         'cart_count': cart_count,
         'cart_total': cart_total,
     }
-
@@ -1,9 +1,13 @@
 import uuid
 from decimal import Decimal
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, NullIf
 from django.conf import settings
-from apps.core.models import Product, Costs
+from django.utils import timezone
+from django.utils.functional import cached_property
+from apps.core.models import Product, Costs, RentalRecord
 
 
 class Cart(models.Model):
@@ -28,18 +32,21 @@ class Cart(models.Model):
             return f"Cart for {self.user.email}"
         return f"Guest Cart ({self.session_key[:8]}...)"
 
-    @property
-    def items_count(self):
-        return sum(item.quantity for item in self.items.all())
-
-    @property
-    def subtotal(self):
-        return sum(item.total for item in self.items.all())
-
-    @property
-    def total(self):
-        """Calculate total including BTW and delivery costs."""
-        subtotal = self.subtotal
+    @cached_property
+    def summary(self):
+        """Item count and totals of the cart, from one aggregate query and one Costs read."""
+        if self.pk is None:
+            # Unsaved (lazy) cart has no items yet
+            totals = {'items_count': 0, 'subtotal': None}
+        else:
+            totals = self.items.aggregate(
+                items_count=Sum('quantity'),
+                subtotal=Sum(
+                    F('quantity') * Coalesce(NullIf('product__sale_price', Value(0)), 'product__price'),
+                    output_field=models.DecimalField(max_digits=12, decimal_places=2)
+                ),
+            )
+        subtotal = totals['subtotal'] or Decimal('0.00')
         costs = Costs.get_costs()
         
         # Calculate BTW based on type
@@ -54,32 +61,77 @@ class Cart(models.Model):
         if costs.delivery_cost_enabled:
             delivery_cost = costs.delivery_cost or Decimal('0.00')
         
-        return subtotal + btw_amount + delivery_cost
+        return {
+            'items_count': totals['items_count'] or 0,
+            'subtotal': subtotal,
+            'btw_amount': btw_amount,
+            'delivery_cost': delivery_cost,
+            'delivery_cost_enabled': costs.delivery_cost_enabled,
+            'total': subtotal + btw_amount + delivery_cost,
+        }
+
+    @cached_property
+    def line_items(self):
+        """Cart items with their products loaded in the same query."""
+        if self.pk is None:
+            return []
+        return list(self.items.select_related('product__category', 'product__primary_image'))
+
+    def reset_summary(self):
+        """Forget the memoized summary and items after the cart changed."""
+        self.__dict__.pop('summary', None)
+        self.__dict__.pop('line_items', None)
+
+    @property
+    def items_count(self):
+        return self.summary['items_count']
+
+    @property
+    def subtotal(self):
+        return self.summary['subtotal']
+
+    @property
+    def total(self):
+        """Calculate total including BTW and delivery costs."""
+        return self.summary['total']
     
     @property
     def btw_amount(self):
         """Calculate BTW amount based on settings."""
-        costs = Costs.get_costs()
-        if costs.btw_type == 'exclusif':
-            return self.subtotal * (costs.btw_percentage / Decimal('100'))
-        return Decimal('0.00')
+        return self.summary['btw_amount']
     
     @property
     def delivery_cost(self):
         """Get delivery cost from settings if enabled."""
-        costs = Costs.get_costs()
-        if costs.delivery_cost_enabled:
-            return costs.delivery_cost or Decimal('0.00')
-        return Decimal('0.00')
+        return self.summary['delivery_cost']
     
     @property
     def delivery_cost_enabled(self):
         """Check if delivery cost is enabled."""
-        costs = Costs.get_costs()
-        return costs.delivery_cost_enabled
+        return self.summary['delivery_cost_enabled']
 
     def clear(self):
-        self.items.all().delete()
+        if self.pk is not None:
+            self.items.all().delete()
+        self.reset_summary()
+
+    @classmethod
+    def purge_stale(cls, empty_before, guest_before):
+        """
+        Delete empty carts not updated since empty_before, and guest carts
+        not updated since guest_before (their session has expired by then).
+        Carts with an item changed since then count as updated.
+        Returns the number of carts deleted.
+        """
+        def recent_items(since):
+            return Exists(CartItem.objects.filter(cart=OuterRef('pk'), updated_at__gte=since))
+        
+        _, deleted = cls.objects.filter(
+            Q(items__isnull=True, updated_at__lt=empty_before) |
+            Q(~recent_items(guest_before), user__isnull=True, updated_at__lt=guest_before)
+        ).delete()
+        # delete() also counts the cascaded cart items
+        return deleted.get(cls._meta.label, 0)
 
     def merge_with(self, other_cart):
         """Merge another cart (guest cart) into this one."""
@@ -92,6 +144,7 @@ class Cart(models.Model):
                 item.cart = self
                 item.save()
         other_cart.delete()
+        self.reset_summary()
 
 
 class CartItem(models.Model):
@@ -115,6 +168,21 @@ class CartItem(models.Model):
     def __str__(self):
         return f"{self.quantity}x {self.product.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._touch_cart()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._touch_cart()
+        return result
+
+    def _touch_cart(self):
+        # Cart activity keeps the cart from being purged as stale
+        Cart.objects.filter(pk=self.cart_id).update(updated_at=timezone.now())
+        if CartItem.cart.is_cached(self):
+            self.cart.reset_summary()
+
     @property
     def price(self):
         return self.product.current_price
@@ -221,6 +289,10 @@ class Order(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
+        indexes = [
+            # Keyset pagination of the dashboard order list
+            models.Index(fields=['-created_at', '-id'], name='orders_order_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.order_number}"
@@ -240,6 +312,53 @@ class Order(models.Model):
         suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
         return f"{prefix}-{suffix}"
 
+    @staticmethod
+    def _unpaid():
+        """Condition for pending orders that are not paid and have no payment in progress."""
+        from apps.payments.models import Payment
+        from apps.payments.services import OPEN_PAYMENT_STATUSES
+        
+        payments = Payment.objects.filter(order=OuterRef('pk'), status__in=OPEN_PAYMENT_STATUSES + ('paid',))
+        return Q(status='pending') & ~Q(payment_status='paid') & ~Exists(payments)
+
+    def cancel(self):
+        """
+        Cancel an unpaid order: put the stock of its selling products back and
+        delete its rental records, which releases their days in the ledger.
+        Returns False when the order was paid, is being paid or is no longer pending.
+        """
+        with transaction.atomic():
+            # Claim the order first, so concurrent cancels return the stock once
+            claimed = Order.objects.filter(Order._unpaid(), pk=self.pk).update(
+                status='cancelled', updated_at=timezone.now()
+            )
+            if not claimed:
+                return False
+            self.status = 'cancelled'
+
+            sold = {}
+            for item in self.items.filter(product__isnull=False, rental_start_date__isnull=True):
+                sold[item.product_id] = sold.get(item.product_id, 0) + item.quantity
+            if sold:
+                Product.objects.filter(pk__in=sold).update(stock=Case(
+                    *[When(pk=product_id, then=F('stock') + quantity) for product_id, quantity in sold.items()],
+                    output_field=models.PositiveIntegerField()
+                ))
+
+            # The rentals never went out, so they are removed rather than marked returned
+            RentalRecord.objects.filter(order_item__order=self).delete()
+        return True
+
+    @classmethod
+    def release_abandoned(cls, placed_before):
+        """
+        Cancel orders placed before placed_before that are still unpaid with
+        no payment in progress, so they stop holding stock and rental days.
+        Returns the number of orders cancelled.
+        """
+        orders = cls.objects.filter(cls._unpaid(), created_at__lt=placed_before).order_by('created_at')
+        return sum(order.cancel() for order in list(orders.only('pk')))
+
     @property
     def shipping_full_name(self):
         return f"{self.shipping_first_name} {self.shipping_last_name}"
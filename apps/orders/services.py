@@ -0,0 +1,96 @@
+from django.db import models, transaction
+from django.db.models import Case, F, When
+from apps.core.models import Product, RentalRecord, RentalAvailability
+from .models import Order, OrderItem
+
+
+class OrderPlacementService:
+    """Service class for turning a cart into an order."""
+
+    def place_order(self, cart, **order_fields):
+        """
+        Create an order from the cart in a single transaction.
+        The affected products are locked (in primary key order, so concurrent
+        checkouts cannot deadlock) and availability is re-checked under the lock.
+        Returns (order, conflicts): order is None when any cart line is no longer
+        available, and conflicts then lists (cart_item, message) for those lines.
+        """
+        with transaction.atomic():
+            cart_items = list(cart.items.all())
+            product_ids = sorted({item.product_id for item in cart_items})
+            products = {
+                product.pk: product
+                for product in Product.objects.select_for_update().filter(pk__in=product_ids).order_by('pk')
+            }
+            for item in cart_items:
+                item.product = products[item.product_id]
+
+            availability = Product.objects.check_availability(
+                [(item.product_id, item.rental_start_date, item.rental_end_date, item.quantity)
+                 for item in cart_items],
+                products=products
+            )
+            conflicts = [
+                (item, message)
+                for item, (is_available, message) in zip(cart_items, availability)
+                if not is_available
+            ]
+            if conflicts:
+                return None, conflicts
+
+            order = Order.objects.create(
+                subtotal=cart.subtotal,
+                total=cart.total,
+                **order_fields
+            )
+
+            # For rental products, include rental dates; for selling products, leave them null
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=item.product,
+                    product_name=item.product.name,
+                    quantity=item.quantity,
+                    price=item.price,
+                    total=item.total,
+                    rental_start_date=item.rental_start_date if item.product.is_rental else None,
+                    rental_end_date=item.rental_end_date if item.product.is_rental else None,
+                )
+                for item in cart_items
+            ])
+
+            # Deduct stock for selling products in one statement; the check
+            # constraint on Product.stock rejects anything that would oversell
+            sold = {}
+            for item in cart_items:
+                if not item.product.is_rental:
+                    sold[item.product_id] = sold.get(item.product_id, 0) + item.quantity
+            if sold:
+                Product.objects.filter(pk__in=sold).update(stock=Case(
+                    *[When(pk=product_id, then=F('stock') - quantity) for product_id, quantity in sold.items()],
+                    output_field=models.PositiveIntegerField()
+                ))
+
+            # Rental products keep their stock; rental records reserve their period in the ledger
+            rentals = RentalRecord.objects.bulk_create([
+                RentalRecord(
+                    product=order_item.product,
+                    order_item=order_item,
+                    customer=order.user,
+                    customer_name=order.shipping_full_name,
+                    customer_email=order.email,
+                    quantity=order_item.quantity,
+                    rental_start_date=order_item.rental_start_date,
+                    return_date=order_item.rental_end_date,
+                )
+                for order_item in order_items
+                if order_item.rental_start_date and order_item.rental_end_date
+            ])
+            RentalAvailability.reserve_many([
+                (rental.product_id, rental.rental_start_date, rental.return_date, rental.quantity)
+                for rental in rentals
+            ])
+
+            cart.clear()
+
+        return order, []
@@ -0,0 +1,162 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+from apps.core.models import Category, Product, RentalAvailability, RentalRecord
+from .models import Cart, CartItem, Order, OrderItem
+from .services import OrderPlacementService
+
+
+class CartPurgeTests(TestCase):
+    """Cart.purge_stale only removes carts nobody has touched."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Decoratie')
+        self.product = Product.objects.create(
+            name='Slinger', description='Slinger', price=Decimal('5.00'), category=category,
+            stock=10, selling_type='selling'
+        )
+        self.now = timezone.now()
+
+    def purge(self):
+        return Cart.purge_stale(
+            empty_before=self.now - timedelta(days=1),
+            guest_before=self.now - timedelta(days=30),
+        )
+
+    def age(self, cart, days):
+        Cart.objects.filter(pk=cart.pk).update(updated_at=self.now - timedelta(days=days))
+
+    def test_old_guest_cart_is_purged(self):
+        cart = Cart.objects.create(session_key='old')
+        CartItem.objects.create(cart=cart, product=self.product)
+        CartItem.objects.create(cart=cart, product=self.product, rental_start_date=self.now.date())
+        CartItem.objects.filter(cart=cart).update(updated_at=self.now - timedelta(days=40))
+        self.age(cart, 40)
+        # Counts carts only, not their cascaded items
+        self.assertEqual(self.purge(), 1)
+        self.assertFalse(Cart.objects.filter(pk=cart.pk).exists())
+        self.assertFalse(CartItem.objects.filter(cart_id=cart.pk).exists())
+
+    def test_adding_an_item_updates_the_cart(self):
+        cart = Cart.objects.create(session_key='active')
+        self.age(cart, 40)
+        CartItem.objects.create(cart=cart, product=self.product)
+        cart.refresh_from_db()
+        self.assertGreaterEqual(cart.updated_at, self.now)
+        self.purge()
+        self.assertTrue(Cart.objects.filter(pk=cart.pk).exists())
+
+    def test_old_cart_with_recent_item_survives(self):
+        cart = Cart.objects.create(session_key='active')
+        CartItem.objects.create(cart=cart, product=self.product)
+        # The cart row itself was not touched for a long time
+        self.age(cart, 40)
+        self.purge()
+        self.assertTrue(Cart.objects.filter(pk=cart.pk).exists())
+
+    def test_removing_an_item_updates_the_cart(self):
+        cart = Cart.objects.create(session_key='active')
+        item = CartItem.objects.create(cart=cart, product=self.product)
+        CartItem.objects.create(cart=cart, product=self.product, rental_start_date=self.now.date())
+        self.age(cart, 40)
+        item.delete()
+        self.purge()
+        self.assertTrue(Cart.objects.filter(pk=cart.pk).exists())
+
+    def test_old_empty_cart_is_purged(self):
+        cart = Cart.objects.create(session_key='empty')
+        self.age(cart, 2)
+        self.assertEqual(self.purge(), 1)
+        self.assertFalse(Cart.objects.filter(pk=cart.pk).exists())
+
+
+class OrderPlacementTests(TestCase):
+    """OrderPlacementService places a whole cart or nothing of it."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Tenten')
+        self.tent = Product.objects.create(
+            name='Partytent', description='Tent', price=Decimal('50.00'), category=category, stock=5
+        )
+        self.garland = Product.objects.create(
+            name='Slinger', description='Slinger', price=Decimal('5.00'), category=category,
+            stock=10, selling_type=Product.SELLING_TYPE_SELLING
+        )
+        self.cart = Cart.objects.create(session_key='checkout')
+        self.rental_item = CartItem.objects.create(
+            cart=self.cart, product=self.tent, quantity=2,
+            rental_start_date=date(2030, 6, 1), rental_end_date=date(2030, 6, 3)
+        )
+        self.selling_item = CartItem.objects.create(cart=self.cart, product=self.garland, quantity=3)
+
+    def place(self):
+        return OrderPlacementService().place_order(
+            self.cart, email='klant@example.com', shipping_first_name='Jan', shipping_last_name='Jansen',
+            shipping_address='Dorpsstraat 1', shipping_city='Utrecht', shipping_postal_code='1234 AB'
+        )
+
+    def reserved(self):
+        return dict(RentalAvailability.objects.filter(product=self.tent).values_list('day', 'reserved'))
+
+    def test_mixed_cart_is_placed(self):
+        total = self.cart.total
+        order, conflicts = self.place()
+
+        self.assertEqual(conflicts, [])
+        self.assertEqual(order.total, total)
+        self.assertEqual(order.subtotal, Decimal('115.00'))
+        items = {item.product_id: item for item in order.items.all()}
+        self.assertEqual(items[self.tent.pk].rental_start_date, date(2030, 6, 1))
+        self.assertIsNone(items[self.garland.pk].rental_start_date)
+
+        self.tent.refresh_from_db()
+        self.garland.refresh_from_db()
+        self.assertEqual(self.tent.stock, 5)
+        self.assertEqual(self.garland.stock, 7)
+
+        rental = RentalRecord.objects.get()
+        self.assertEqual(rental.order_item, items[self.tent.pk])
+        self.assertEqual((rental.quantity, rental.customer_email), (2, 'klant@example.com'))
+        self.assertEqual(self.reserved(), {date(2030, 6, 1): 2, date(2030, 6, 2): 2, date(2030, 6, 3): 2})
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+
+    def test_exhausted_stock_places_nothing(self):
+        self.selling_item.quantity = 11
+        self.selling_item.save()
+
+        order, conflicts = self.place()
+
+        self.assertIsNone(order)
+        self.assertEqual(conflicts, [(self.selling_item, "Only 10 items in stock")])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(RentalRecord.objects.exists())
+        self.assertEqual(self.reserved(), {})
+        self.garland.refresh_from_db()
+        self.assertEqual(self.garland.stock, 10)
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+
+    def test_exhausted_rental_capacity_places_nothing(self):
+        RentalRecord.objects.create(
+            product=self.tent, quantity=4, rental_start_date=date(2030, 6, 3), return_date=date(2030, 6, 5)
+        )
+
+        order, conflicts = self.place()
+
+        self.assertIsNone(order)
+        self.assertEqual(conflicts, [(self.rental_item, "Only 1 items available for this period")])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(RentalRecord.objects.count(), 1)
+        self.assertEqual(self.reserved(), {date(2030, 6, 3): 4, date(2030, 6, 4): 4, date(2030, 6, 5): 4})
+        # The selling line of the rejected cart keeps its stock
+        self.garland.refresh_from_db()
+        self.assertEqual(self.garland.stock, 10)
+
+    def test_stock_constraint_rejects_overselling(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.filter(pk=self.garland.pk).update(stock=F('stock') - 11)
+        self.garland.refresh_from_db()
+        self.assertEqual(self.garland.stock, 10)
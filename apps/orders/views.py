@@ -8,21 +8,39 @@ from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.conf import settings
-from apps.core.models import Product, RentalRecord
-from .models import Cart, CartItem, Order, OrderItem
+from apps.core.models import Product
+from .models import Cart, CartItem, Order
 from .forms import CheckoutForm, ShippingForm
+from .services import OrderPlacementService
+from .cart_summary import store_summary
 
 
 class CartMixin:
-    """Mixin to get or create cart."""
+    """Mixin to get (or lazily create) the cart."""
     
-    def get_cart(self, request):
-        if request.user.is_authenticated:
-            cart, created = Cart.objects.get_or_create(user=request.user)
-        else:
-            if not request.session.session_key:
-                request.session.create()
-            cart, created = Cart.objects.get_or_create(session_key=request.session.session_key)
+    def get_cart(self, request, create=False):
+        """
+        Return the visitor's cart. Without create, a visitor who has no cart
+        gets an unsaved empty Cart, so plain GETs never create a session or
+        cart row; pass create=True before adding items.
+        """
+        # Keep the cart on the request so its memoized totals are shared
+        # with the cart_context processor
+        cart = getattr(request, '_cart', None)
+        if cart is None:
+            if request.user.is_authenticated:
+                cart = Cart.objects.filter(user=request.user).first()
+            elif request.session.session_key:
+                cart = Cart.objects.filter(session_key=request.session.session_key).first()
+            cart = cart or Cart()
+        if create and cart.pk is None:
+            if request.user.is_authenticated:
+                cart, created = Cart.objects.get_or_create(user=request.user)
+            else:
+                if not request.session.session_key:
+                    request.session.create()
+                cart, created = Cart.objects.get_or_create(session_key=request.session.session_key)
+        request._cart = cart
         return cart
 
 
@@ -32,7 +50,18 @@ class CartView(CartMixin, View):
 
     def get(self, request):
         cart = self.get_cart(request)
-        return render(request, self.template_name, {'cart': cart})
+        cart_items = cart.line_items
+        
+        # Flag lines that are no longer available (dates passed, stock taken)
+        availability = Product.objects.check_availability(
+            (item.product_id, item.rental_start_date, item.rental_end_date, item.quantity)
+            for item in cart_items
+        )
+        for item, (is_available, message) in zip(cart_items, availability):
+            item.is_available = is_available
+            item.availability_message = message
+        
+        return render(request, self.template_name, {'cart': cart, 'cart_items': cart_items})
 
 
 class CartAddView(CartMixin, View):
@@ -82,7 +111,7 @@ class CartAddView(CartMixin, View):
             if not can_purchase:
                 return JsonResponse({'success': False, 'error': message}, status=400)
 
-        cart = self.get_cart(request)
+        cart = self.get_cart(request, create=True)
         
         # Check for existing cart item with same product (and dates for rental)
         if product.is_rental:
@@ -123,15 +152,15 @@ class CartAddView(CartMixin, View):
 
         # Check if AJAX request
         if request.headers.get('Content-Type') == 'application/json':
-            return JsonResponse({
+            return store_summary(request, JsonResponse({
                 'success': True,
                 'cart_count': cart.items_count,
                 'cart_total': float(cart.total),
                 'message': f'{product.name} added to cart'
-            })
+            }), cart)
         
         messages.success(request, f'{product.name} added to cart!')
-        return redirect('orders:cart')
+        return store_summary(request, redirect('orders:cart'), cart)
 
 
 class CartUpdateView(CartMixin, View):
@@ -151,6 +180,8 @@ class CartUpdateView(CartMixin, View):
         cart = self.get_cart(request)
         
         try:
+            if cart.pk is None:
+                raise CartItem.DoesNotExist()
             if cart_item_id:
                 cart_item = CartItem.objects.get(id=cart_item_id, cart=cart)
             else:
@@ -159,23 +190,15 @@ class CartUpdateView(CartMixin, View):
                     raise CartItem.DoesNotExist()
             
             if quantity > 0:
-                # Validate stock availability
-                product = cart_item.product
-                if product.is_rental:
-                    # For rental products, validate rental dates and availability
-                    if cart_item.rental_start_date and cart_item.rental_end_date:
-                        can_rent, message = product.can_rent(
-                            cart_item.rental_start_date, 
-                            cart_item.rental_end_date, 
-                            quantity
-                        )
-                        if not can_rent:
-                            return JsonResponse({'success': False, 'error': message}, status=400)
-                else:
-                    # For selling products, just check stock
-                    can_purchase, message = product.can_purchase(quantity)
-                    if not can_purchase:
-                        return JsonResponse({'success': False, 'error': message}, status=400)
+                # Validate stock availability, with the other cart lines claiming their units first
+                lines = [
+                    (item.product_id, item.rental_start_date, item.rental_end_date, item.quantity)
+                    for item in cart.items.exclude(pk=cart_item.pk)
+                ]
+                lines.append((cart_item.product_id, cart_item.rental_start_date, cart_item.rental_end_date, quantity))
+                is_available, message = Product.objects.check_availability(lines)[-1]
+                if not is_available:
+                    return JsonResponse({'success': False, 'error': message}, status=400)
                 
                 cart_item.quantity = quantity
                 cart_item.save()
@@ -185,14 +208,14 @@ class CartUpdateView(CartMixin, View):
             return JsonResponse({'success': False, 'error': 'Item not in cart'}, status=404)
 
         if request.headers.get('Content-Type') == 'application/json':
-            return JsonResponse({
+            return store_summary(request, JsonResponse({
                 'success': True,
                 'cart_count': cart.items_count,
                 'cart_total': float(cart.total),
                 'item_total': float(cart_item.total) if quantity > 0 else 0
-            })
+            }), cart)
         
-        return redirect('orders:cart')
+        return store_summary(request, redirect('orders:cart'), cart)
 
 
 class CartRemoveView(CartMixin, View):
@@ -210,7 +233,9 @@ class CartRemoveView(CartMixin, View):
         cart = self.get_cart(request)
         
         try:
-            if cart_item_id:
+            if cart.pk is None:
+                cart_item = None
+            elif cart_item_id:
                 cart_item = CartItem.objects.get(id=cart_item_id, cart=cart)
             else:
                 cart_item = CartItem.objects.filter(cart=cart, product_id=product_id).first()
@@ -220,14 +245,14 @@ class CartRemoveView(CartMixin, View):
             pass
 
         if request.headers.get('Content-Type') == 'application/json':
-            return JsonResponse({
+            return store_summary(request, JsonResponse({
                 'success': True,
                 'cart_count': cart.items_count,
                 'cart_total': float(cart.total)
-            })
+            }), cart)
         
         messages.success(request, 'Item removed from cart.')
-        return redirect('orders:cart')
+        return store_summary(request, redirect('orders:cart'), cart)
 
 
 class CartClearView(CartMixin, View):
@@ -238,10 +263,10 @@ class CartClearView(CartMixin, View):
         cart.clear()
         
         if request.headers.get('Content-Type') == 'application/json':
-            return JsonResponse({'success': True, 'cart_count': 0, 'cart_total': 0})
+            return store_summary(request, JsonResponse({'success': True, 'cart_count': 0, 'cart_total': 0}), cart)
         
         messages.success(request, 'Cart cleared.')
-        return redirect('orders:cart')
+        return store_summary(request, redirect('orders:cart'), cart)
 
 
 class CheckoutView(CartMixin, View):
@@ -340,7 +365,7 @@ class CheckoutPaymentView(CartMixin, View):
         if 'checkout_shipping' not in request.session:
             return redirect('orders:checkout_shipping')
         
-        # Get available payment methods from Mollie
+        # Payment methods from the cached Mollie catalogue
         from apps.payments.services import MollieService
         mollie_service = MollieService()
         # Pass cart total to get only methods applicable for this amount
@@ -393,6 +418,9 @@ class CheckoutConfirmView(CartMixin, View):
 
     def post(self, request):
         cart = self.get_cart(request)
+        if cart.items_count == 0:
+            messages.warning(request, 'Your cart is empty.')
+            return redirect('orders:cart')
         checkout_info = request.session.get('checkout_info', {})
         checkout_shipping = request.session.get('checkout_shipping', {})
         checkout_payment = request.session.get('checkout_payment', {})
@@ -414,31 +442,6 @@ class CheckoutConfirmView(CartMixin, View):
             messages.error(request, 'Please select a payment method.')
             return redirect('orders:checkout_payment')
         
-        # Validate stock availability before creating order
-        for cart_item in cart.items.all():
-            product = cart_item.product
-            
-            if product.is_rental:
-                # For rental products, validate rental dates and availability
-                if cart_item.rental_start_date and cart_item.rental_end_date:
-                    can_rent, message = product.can_rent(
-                        cart_item.rental_start_date,
-                        cart_item.rental_end_date,
-                        cart_item.quantity
-                    )
-                    if not can_rent:
-                        messages.error(request, f"{product.name}: {message}")
-                        return redirect('orders:cart')
-                else:
-                    messages.error(request, f"{product.name}: Rental dates are required for rental products.")
-                    return redirect('orders:cart')
-            else:
-                # For selling products, just check if stock is available
-                can_purchase, message = product.can_purchase(cart_item.quantity)
-                if not can_purchase:
-                    messages.error(request, f"{product.name}: {message}")
-                    return redirect('orders:cart')
-        
         # Get email with fallback
         email = checkout_info.get('email')
         if not email and request.user.is_authenticated:
@@ -448,8 +451,9 @@ class CheckoutConfirmView(CartMixin, View):
             messages.error(request, 'Email address is required.')
             return redirect('orders:checkout_info')
         
-        # Create order
-        order = Order.objects.create(
+        # Create order, order items and rental records in one transaction
+        order, conflicts = OrderPlacementService().place_order(
+            cart,
             user=request.user if request.user.is_authenticated else None,
             email=email,
             phone=checkout_info.get('phone', ''),
@@ -462,49 +466,15 @@ class CheckoutConfirmView(CartMixin, View):
             shipping_state=checkout_shipping.get('shipping_state', ''),
             shipping_postal_code=checkout_shipping.get('shipping_postal_code'),
             shipping_country=checkout_shipping.get('shipping_country', 'Netherlands'),
-            subtotal=cart.subtotal,
-            total=cart.total,
             payment_method=checkout_payment.get('method', 'ideal'),
             customer_notes=request.POST.get('notes', ''),
         )
+        if conflicts:
+            for cart_item, message in conflicts:
+                messages.error(request, f"{cart_item.product.name}: {message}")
+            return redirect('orders:cart')
         
-        # Create order items and rental records
-        for cart_item in cart.items.all():
-            product = cart_item.product
-            
-            # For rental products, include rental dates; for selling products, leave them null
-            order_item = OrderItem.objects.create(
-                order=order,
-                product=product,
-                product_name=product.name,
-                quantity=cart_item.quantity,
-                price=cart_item.price,
-                total=cart_item.total,
-                rental_start_date=cart_item.rental_start_date if product.is_rental else None,
-                rental_end_date=cart_item.rental_end_date if product.is_rental else None,
-            )
-            
-            # Deduct stock from product (for both rental and selling products)
-            product.stock = max(0, product.stock - cart_item.quantity)
-            product.save(update_fields=['stock'])
-            
-            # Create rental record for stock tracking (only for rental products)
-            # Stock for rental products will be restored when marked as returned
-            # Stock for selling products is permanently reduced
-            if product.is_rental and cart_item.rental_start_date and cart_item.rental_end_date:
-                RentalRecord.objects.create(
-                    product=product,
-                    order_item=order_item,
-                    customer=order.user,
-                    customer_name=order.shipping_full_name,
-                    customer_email=order.email,
-                    quantity=cart_item.quantity,
-                    rental_start_date=cart_item.rental_start_date,
-                    return_date=cart_item.rental_end_date,
-                )
-        
-        # Clear cart and session
-        cart.clear()
+        # Clear checkout session data
         for key in ['checkout_info', 'checkout_shipping', 'checkout_payment']:
             request.session.pop(key, None)
         
@@ -519,8 +489,8 @@ class CheckoutConfirmView(CartMixin, View):
         except Exception as e:
             print(f"Failed to send admin notification email: {e}")
 
-        # Redirect to Mollie payment processing
-        return redirect('payments:process', order_number=order.order_number)
+        # Redirect to Mollie payment processing (the cart is now empty)
+        return store_summary(request, redirect('payments:process', order_number=order.order_number), cart)
 
 
 class OrderSuccessView(View):
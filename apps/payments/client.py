@@ -0,0 +1,134 @@
+"""
+Process-level Mollie API client.
+
+The Mollie SDK opens a new requests session for every Client instance, so a
+MollieService built per request paid a TCP and TLS handshake on every call.
+get_mollie_client() instead returns one client per process whose session
+keeps its connections to api.mollie.com alive in a pool, with explicit
+connect and read timeouts and a bounded number of retries. Only connection
+failures and idempotent GETs are retried (with jittered backoff); a POST
+that may have reached Mollie is never sent twice. The latency of every call
+is counted per HTTP method and resource (see mollie_call_stats()).
+
+The SDK has no public hook for its HTTP session, so PooledClient relies on
+two private parts of mollie-api-python 3.0.0 (pinned in requirements.txt):
+the Client._client session, which is only created when missing, and the
+Client._setup_retry() method. Check both before upgrading the SDK; the tests
+in tests.py fail when the pooled session is no longer used.
+"""
+import logging
+import threading
+import time
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from mollie.api.client import Client
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying a GET for
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Calls slower than this (seconds) are logged
+SLOW_CALL_SECONDS = 2
+
+MOLLIE_CALL_STATS_KEY = 'mollie-calls'
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _count(key, amount=1):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # Evicted between add() and incr()
+        pass
+
+
+def _record_call(method, resource, seconds, failed):
+    prefix = f'{MOLLIE_CALL_STATS_KEY}:{method}:{resource}'
+    _count(f'{prefix}:count')
+    _count(f'{prefix}:ms', int(seconds * 1000))
+    if failed:
+        _count(f'{prefix}:errors')
+    cache.add(f'{MOLLIE_CALL_STATS_KEY}:endpoints', set(), None)
+    endpoints = cache.get(f'{MOLLIE_CALL_STATS_KEY}:endpoints') or set()
+    if (method, resource) not in endpoints:
+        cache.set(f'{MOLLIE_CALL_STATS_KEY}:endpoints', endpoints | {(method, resource)}, None)
+    if seconds >= SLOW_CALL_SECONDS:
+        logger.warning("Slow Mollie call: %s %s took %.2fs", method, resource, seconds)
+
+
+def mollie_call_stats():
+    """{(method, resource): {'count', 'errors', 'avg_ms'}} of the Mollie API calls made so far."""
+    stats = {}
+    for method, resource in sorted(cache.get(f'{MOLLIE_CALL_STATS_KEY}:endpoints') or ()):
+        prefix = f'{MOLLIE_CALL_STATS_KEY}:{method}:{resource}'
+        count = cache.get(f'{prefix}:count', 0)
+        stats[(method, resource)] = {
+            'count': count,
+            'errors': cache.get(f'{prefix}:errors', 0),
+            'avg_ms': cache.get(f'{prefix}:ms', 0) / count if count else 0,
+        }
+    return stats
+
+
+class PooledClient(Client):
+    """Mollie client sending its requests through one pooled, retrying session."""
+
+    def __init__(self, timeout, retries, pool_size, **kwargs):
+        super().__init__(timeout=timeout, retry=retries, **kwargs)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            allowed_methods=frozenset({'GET'}),
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=0.5,
+            backoff_jitter=0.5,
+            respect_retry_after_header=True,
+            # Hand the last error response to the SDK, which raises the Mollie error for it
+            raise_on_status=False,
+        )
+        self._client = requests.Session()
+        self._client.verify = True
+        self._client.mount('https://', requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        ))
+
+    def _setup_retry(self):
+        # The session's adapter is mounted in __init__
+        pass
+
+    def perform_http_call(self, http_method, path, data=None, params=None):
+        started = time.monotonic()
+        failed = True
+        try:
+            response = super().perform_http_call(http_method, path, data=data, params=params)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            try:
+                _record_call(http_method, path.split('/')[0], time.monotonic() - started, failed)
+            except Exception:
+                logger.exception("Failed to record Mollie call metrics")
+
+
+def get_mollie_client():
+    """The Mollie client of this process, created on first use."""
+    global _client
+    if _client is None or _client.api_key != settings.MOLLIE_API_KEY:
+        with _client_lock:
+            if _client is None or _client.api_key != settings.MOLLIE_API_KEY:
+                client = PooledClient(
+                    timeout=(settings.MOLLIE_CONNECT_TIMEOUT, settings.MOLLIE_READ_TIMEOUT),
+                    retries=settings.MOLLIE_MAX_RETRIES,
+                    pool_size=settings.MOLLIE_POOL_SIZE,
+                )
+                client.set_api_key(settings.MOLLIE_API_KEY)
+                _client = client
+    return _client
@@ -1,98 +1,245 @@
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from mollie.api.client import Client
+from .client import get_mollie_client
 from .models import Payment, Support
 
+logger = logging.getLogger(__name__)
+
+
+# Seconds a cached method list is fresh; older lists are served while a
+# Celery task refreshes them, and kept for PAYMENT_METHODS_STALE_TIMEOUT so
+# they can still be served while Mollie is unreachable
+PAYMENT_METHODS_TIMEOUT = 60 * 30
+PAYMENT_METHODS_STALE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Payment method display info
+PAYMENT_METHOD_INFO = {
+    'ideal': {
+        'name': 'iDEAL',
+        'description': 'Pay directly from your Dutch bank account',
+        'icon': 'https://www.mollie.com/external/icons/payment-methods/ideal.svg',
+    },
+    'paypal': {
+        'name': 'PayPal',
+        'description': 'Pay with your PayPal account',
+        'icon': 'https://www.mollie.com/external/icons/payment-methods/paypal.svg',
+    },
+    'creditcard': {
+        'name': 'Credit Card',
+        'description': 'Visa, Mastercard, American Express',
+        'icon': 'https://www.mollie.com/external/icons/payment-methods/visa.svg',
+        'icons': [
+            'https://www.mollie.com/external/icons/payment-methods/visa.svg',
+            'https://www.mollie.com/external/icons/payment-methods/mastercard.svg',
+        ],
+    },
+    'banktransfer': {
+        'name': 'Bank Transfer',
+        'description': 'Pay via manual bank transfer',
+        'icon': 'https://www.mollie.com/external/icons/payment-methods/banktransfer.svg',
+    },
+}
+
+# Seconds a queued webhook suppresses duplicates of itself, in case its task is lost
+WEBHOOK_QUEUED_TIMEOUT = 60 * 10
+
+# Map Mollie payment statuses to our Payment and Support statuses
+PAYMENT_STATUSES = {
+    'open': 'open',
+    'pending': 'pending',
+    'authorized': 'authorized',
+    'paid': 'paid',
+    'failed': 'failed',
+    'expired': 'expired',
+    'canceled': 'canceled',
+}
+SUPPORT_STATUSES = {
+    'open': 'open',
+    'pending': 'pending',
+    'paid': 'paid',
+    'failed': 'failed',
+    'expired': 'expired',
+    'canceled': 'canceled',
+}
+
+# Statuses a returning customer waits on; the webhook normally resolves them
+PENDING_PAYMENT_STATUSES = ('open', 'pending')
+
+# Statuses a payment can still move on from; all others (paid, failed,
+# expired, canceled, refunded) are final
+OPEN_PAYMENT_STATUSES = ('open', 'pending', 'authorized')
+
+# Seconds after the customer's return before Mollie is asked directly, and
+# the minimum interval between such requests for one payment
+RETURN_WEBHOOK_GRACE = 10
+RETURN_REFRESH_INTERVAL = 60
+
+# Payments still open or pending this many seconds after creation are
+# checked by the reconciliation task, in batches, a few requests at a time
+RECONCILE_STALE_AFTER = 60 * 15
+RECONCILE_BATCH_SIZE = 100
+RECONCILE_MAX_WORKERS = 5
+
+DEFAULT_PAYMENT_METHODS = [dict(PAYMENT_METHOD_INFO['ideal'], id='ideal')]
+
+
+def _payment_methods_key(currency):
+    return f'mollie-methods:{currency}'
+
+
+def _webhook_key(kind, mollie_payment_id):
+    return f'mollie-webhook:{kind}:{mollie_payment_id}'
+
+
+def _send_payment_emails(order_id):
+    # Send order confirmation email to customer
+    from apps.notifications.tasks import send_order_confirmation_email, send_payment_confirmation_email
+    try:
+        send_order_confirmation_email(order_id)
+        send_payment_confirmation_email(order_id)
+    except Exception as e:
+        print(f"Failed to send confirmation emails: {e}")
+
+
+def queue_webhook(kind, mollie_payment_id):
+    """
+    Queue the reconciliation of a payment Mollie sent a webhook for. Webhooks
+    arriving while one for the same payment is still queued are dropped.
+    Returns False when the broker cannot be reached.
+    """
+    key = _webhook_key(kind, mollie_payment_id)
+    if not cache.add(key, True, WEBHOOK_QUEUED_TIMEOUT):
+        return True
+    from apps.notifications.tasks import process_mollie_webhook
+    try:
+        process_mollie_webhook.delay(kind, mollie_payment_id)
+        return True
+    except Exception as e:
+        print(f"Failed to queue Mollie webhook: {e}")
+        cache.delete(key)
+        return False
+
+
+def webhook_dequeued(kind, mollie_payment_id):
+    """Let new webhooks for a payment queue again once its task has started."""
+    cache.delete(_webhook_key(kind, mollie_payment_id))
+
+
+def refresh_returned_status(kind, record):
+    """
+    Status of a payment ('payment') or support payment ('support') whose
+    customer is back from Mollie and waiting for it. This is the local status
+    the webhook keeps up to date; only when the webhook is overdue is Mollie
+    asked directly, at most once per RETURN_REFRESH_INTERVAL.
+    """
+    if record.status not in PENDING_PAYMENT_STATUSES or not record.mollie_payment_id:
+        return record
+    key = f'mollie-return:{kind}:{record.pk}'
+    cache.add(key, time.time(), RETURN_REFRESH_INTERVAL * 10)
+    returned_at = cache.get(key) or time.time()
+    if time.time() - returned_at < RETURN_WEBHOOK_GRACE:
+        return record
+    if not cache.add(f'{key}:refreshing', True, RETURN_REFRESH_INTERVAL):
+        return record
+    try:
+        if kind == 'support':
+            return MollieService().update_support_status(record)
+        return MollieService().update_payment_status(record)
+    except Exception as e:
+        print(f"Error refreshing {kind} status from Mollie: {e}")
+        return record
+
 
 class MollieService:
     """Service class for Mollie payment integration."""
     
     def __init__(self):
-        self.client = Client()
-        self.client.set_api_key(settings.MOLLIE_API_KEY)
+        self.client = get_mollie_client()
+    
+    def fetch_payment_methods(self, amount=None, currency='EUR'):
+        """
+        Fetch the payment methods we support from Mollie, with the amount range
+        each accepts. Raises when Mollie cannot be reached.
+        """
+        # Check if API key is set
+        if not settings.MOLLIE_API_KEY:
+            raise ValueError("MOLLIE_API_KEY is not set in settings")
+        
+        # Fetch methods from Mollie (with amount/currency to get only applicable methods)
+        if amount:
+            methods = self.client.methods.list(
+                amount={'currency': currency, 'value': f'{amount:.2f}'}
+            )
+        else:
+            methods = self.client.methods.list()
+        
+        available_methods = []
+        for method in methods:
+            method_id = method.get('id')
+            if method_id in PAYMENT_METHOD_INFO:
+                info = dict(PAYMENT_METHOD_INFO[method_id], id=method_id)
+                info['minimum'] = (method.get('minimumAmount') or {}).get('value')
+                info['maximum'] = (method.get('maximumAmount') or {}).get('value')
+                available_methods.append(info)
+        return available_methods
+    
+    def refresh_payment_methods(self, currency='EUR'):
+        """
+        Fetch the whole method catalogue and store it in the cache. It is
+        fetched without an amount, so Mollie leaves no method out for its
+        minimum or maximum; the stored limits are applied per amount instead.
+        """
+        methods = self.fetch_payment_methods(currency=currency)
+        cache.set(
+            _payment_methods_key(currency),
+            {'fetched_at': time.time(), 'methods': methods},
+            PAYMENT_METHODS_STALE_TIMEOUT
+        )
+        cache.delete(f'{_payment_methods_key(currency)}:refreshing')
+        return methods
     
     def get_available_payment_methods(self, amount=None, currency='EUR'):
-        """Get list of available payment methods from Mollie."""
-        try:
-            # Check if API key is set
-            if not settings.MOLLIE_API_KEY:
-                raise ValueError("MOLLIE_API_KEY is not set in settings")
-            
-            # Fetch methods from Mollie (with amount/currency to get only applicable methods)
-            # The methods.list() can take amount and currency as parameters
-            if amount:
-                methods = self.client.methods.list(
-                    amount={'currency': currency, 'value': f'{amount:.2f}'}
-                )
-            else:
-                methods = self.client.methods.list()
-            available_methods = []
-            
-            # Payment method display info
-            method_info = {
-                'ideal': {
-                    'name': 'iDEAL',
-                    'description': 'Pay directly from your Dutch bank account',
-                    'icon': 'https://www.mollie.com/external/icons/payment-methods/ideal.svg',
-                },
-                'paypal': {
-                    'name': 'PayPal',
-                    'description': 'Pay with your PayPal account',
-                    'icon': 'https://www.mollie.com/external/icons/payment-methods/paypal.svg',
-                },
-                'creditcard': {
-                    'name': 'Credit Card',
-                    'description': 'Visa, Mastercard, American Express',
-                    'icon': 'https://www.mollie.com/external/icons/payment-methods/visa.svg',
-                    'icons': [
-                        'https://www.mollie.com/external/icons/payment-methods/visa.svg',
-                        'https://www.mollie.com/external/icons/payment-methods/mastercard.svg',
-                    ],
-                },
-                'banktransfer': {
-                    'name': 'Bank Transfer',
-                    'description': 'Pay via manual bank transfer',
-                    'icon': 'https://www.mollie.com/external/icons/payment-methods/banktransfer.svg',
-                },
-            }
-            
-            # Process methods from Mollie
-            # Mollie returns a list-like object, iterate through it
-            for method in methods:
-                # Handle both dict and object access
-                method_id = method['id'] if isinstance(method, dict) else getattr(method, 'id', None)
-                
-                if method_id and method_id in method_info:
-                    info = method_info[method_id].copy()
-                    info['id'] = method_id
-                    available_methods.append(info)
-            
-            # If no methods found, return default
-            if not available_methods:
-                return [
-                    {
-                        'id': 'ideal',
-                        'name': 'iDEAL',
-                        'description': 'Pay directly from your Dutch bank account',
-                        'icon': 'https://www.mollie.com/external/icons/payment-methods/ideal.svg',
-                    }
-                ]
-            
-            return available_methods
-            
-        except Exception as e:
-            import traceback
-            print(f"Error fetching available payment methods from Mollie: {e}")
-            print(traceback.format_exc())
-            # Return default methods if API call fails
-            return [
-                {
-                    'id': 'ideal',
-                    'name': 'iDEAL',
-                    'description': 'Pay directly from your Dutch bank account',
-                    'icon': 'https://www.mollie.com/external/icons/payment-methods/ideal.svg',
-                }
+        """
+        Payment methods available for an amount, from the cached catalogue
+        narrowed with each method's minimum and maximum amount. Only a cold
+        cache waits for Mollie; an outdated catalogue is served while a
+        Celery task refreshes it.
+        """
+        key = _payment_methods_key(currency)
+        entry = cache.get(key)
+        if entry is None:
+            try:
+                methods = self.refresh_payment_methods(currency)
+            except Exception:
+                logger.exception("Error fetching available payment methods from Mollie")
+                return list(DEFAULT_PAYMENT_METHODS)
+        else:
+            methods = entry['methods']
+            if entry['fetched_at'] + PAYMENT_METHODS_TIMEOUT < time.time() and cache.add(f'{key}:refreshing', True, 60):
+                from apps.notifications.tasks import refresh_payment_methods
+                try:
+                    refresh_payment_methods.delay(currency)
+                except Exception as e:
+                    logger.warning("Failed to schedule payment method refresh: %s", e)
+        
+        if amount is not None:
+            methods = [
+                method for method in methods
+                if (method['minimum'] is None or Decimal(method['minimum']) <= amount)
+                and (method['maximum'] is None or amount <= Decimal(method['maximum']))
             ]
+        
+        # If no methods found, return default
+        return methods or list(DEFAULT_PAYMENT_METHODS)
     
     def create_payment(self, order, method='ideal', redirect_url='', webhook_url=''):
         """Create a new Mollie payment."""
@@ -168,47 +315,48 @@ class MollieService:
         
         mollie_payment = self.client.payments.get(payment.mollie_payment_id)
         
-        # Map Mollie status to our status
-        status_mapping = {
-            'open': 'open',
-            'pending': 'pending',
-            'authorized': 'authorized',
-            'paid': 'paid',
-            'failed': 'failed',
-            'expired': 'expired',
-            'canceled': 'canceled',
-        }
-        
-        new_status = status_mapping.get(mollie_payment['status'], 'pending')
-        payment.status = new_status
-        
-        if mollie_payment['method']:
-            payment.method = mollie_payment['method']
-        
+        new_status = PAYMENT_STATUSES.get(mollie_payment['status'], 'pending')
+        return self.apply_payment_status(payment, new_status, mollie_payment['method'])
+    
+    def apply_payment_status(self, payment, new_status, method=None):
+        """
+        Move a payment to a status reported by Mollie. Only the caller that
+        actually makes the transition updates the order and sends the
+        confirmation emails, so repeated webhooks and returns change nothing,
+        and a payment in a final status is never moved again.
+        """
+        now = timezone.now()
+        updates = {'status': new_status, 'updated_at': now}
+        if method:
+            updates['method'] = method
         if new_status == 'paid':
-            payment.paid_at = timezone.now()
+            updates['paid_at'] = now
+        
+        with transaction.atomic():
+            # Late or out-of-order notifications cannot move a payment out of a final status
+            changed = Payment.objects.filter(
+                pk=payment.pk, status__in=OPEN_PAYMENT_STATUSES
+            ).exclude(status=new_status).update(**updates)
+            if not changed and method and payment.method != method:
+                Payment.objects.filter(pk=payment.pk).update(method=method)
+            payment.refresh_from_db()
+            if not changed:
+                return payment
             
-            # Update order status
-            order = payment.order
-            order.payment_status = 'paid'
-            order.status = 'paid'
-            order.paid_at = timezone.now()
-            order.save()
+            if new_status == 'paid':
+                # Update order status
+                order = payment.order
+                order.payment_status = 'paid'
+                order.status = 'paid'
+                order.paid_at = now
+                order.save()
+                transaction.on_commit(lambda: _send_payment_emails(order.id))
             
-            # Send order confirmation email to customer
-            from apps.notifications.tasks import send_order_confirmation_email, send_payment_confirmation_email
-            try:
-                send_order_confirmation_email(order.id)
-                send_payment_confirmation_email(order.id)
-            except Exception as e:
-                print(f"Failed to send confirmation emails: {e}")
-        
-        elif new_status in ['failed', 'expired', 'canceled']:
-            order = payment.order
-            order.payment_status = 'failed'
-            order.save()
+            elif new_status in ['failed', 'expired', 'canceled']:
+                order = payment.order
+                order.payment_status = 'failed'
+                order.save()
         
-        payment.save()
         return payment
     
     def refund_payment(self, payment, amount=None, reason=''):
@@ -313,22 +461,84 @@ class MollieService:
         
         mollie_payment = self.client.payments.get(support.mollie_payment_id)
         
-        # Map Mollie status to our status
-        status_mapping = {
-            'open': 'open',
-            'pending': 'pending',
-            'paid': 'paid',
-            'failed': 'failed',
-            'expired': 'expired',
-            'canceled': 'canceled',
-        }
-        
-        new_status = status_mapping.get(mollie_payment['status'], 'pending')
-        support.status = new_status
-        
+        new_status = SUPPORT_STATUSES.get(mollie_payment['status'], 'pending')
+        return self.apply_support_status(support, new_status)
+    
+    def apply_support_status(self, support, new_status):
+        """Move a support payment that is still open or pending to a status reported by Mollie, once."""
+        now = timezone.now()
+        updates = {'status': new_status, 'updated_at': now}
         if new_status == 'paid':
-            support.paid_at = timezone.now()
-        
-        support.save()
+            updates['paid_at'] = now
+        Support.objects.filter(
+            pk=support.pk, status__in=PENDING_PAYMENT_STATUSES
+        ).exclude(status=new_status).update(**updates)
+        support.refresh_from_db()
         return support
-
+    
+    def reconcile_stale_payments(self, kind, stale_after=RECONCILE_STALE_AFTER,
+                                 batch_size=RECONCILE_BATCH_SIZE, max_workers=RECONCILE_MAX_WORKERS):
+        """
+        Catch up on missed webhooks: fetch the Mollie status of every payment
+        ('payment') or support payment ('support') still open or pending
+        stale_after seconds after its creation, oldest first, and apply the
+        ones that changed the way a webhook would. Returns counters
+        {'checked', 'changed', 'errors', <new status>: count}.
+        """
+        model = Support if kind == 'support' else Payment
+        queryset = model.objects.filter(
+            status__in=PENDING_PAYMENT_STATUSES,
+            created_at__lt=timezone.now() - timedelta(seconds=stale_after),
+            mollie_payment_id__isnull=False,
+        ).exclude(mollie_payment_id='').order_by('created_at', 'id')
+        
+        stats = Counter(checked=0, changed=0, errors=0)
+        last = None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                # Seek past the previous batch; applied rows drop out of the filter meanwhile
+                batch = queryset
+                if last is not None:
+                    batch = batch.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]))
+                batch = list(batch[:batch_size])
+                if not batch:
+                    break
+                last = (batch[-1].created_at, batch[-1].id)
+                
+                # Only the Mollie requests run in the pool; transitions are applied here
+                fetches = [
+                    (record, executor.submit(self.client.payments.get, record.mollie_payment_id))
+                    for record in batch
+                ]
+                for record, fetch in fetches:
+                    stats['checked'] += 1
+                    previous = record.status
+                    try:
+                        mollie_payment = fetch.result()
+                        if kind == 'support':
+                            new_status = SUPPORT_STATUSES.get(mollie_payment['status'], 'pending')
+                            if new_status != previous:
+                                record = self.apply_support_status(record, new_status)
+                        else:
+                            new_status = PAYMENT_STATUSES.get(mollie_payment['status'], 'pending')
+                            if new_status != previous:
+                                record = self.apply_payment_status(record, new_status, mollie_payment['method'])
+                    except Exception:
+                        logger.exception("Error reconciling %s %s", kind, record.mollie_payment_id)
+                        stats['errors'] += 1
+                        continue
+                    if record.status != previous:
+                        stats['changed'] += 1
+                        stats[record.status] += 1
+        return dict(stats)
+    
+    def process_webhook(self, kind, mollie_payment_id):
+        """
+        Reconcile the payment ('payment') or support payment ('support') a
+        Mollie webhook was about. Returns None for unknown payment IDs.
+        """
+        if kind == 'support':
+            support = Support.objects.filter(mollie_payment_id=mollie_payment_id).first()
+            return support and self.update_support_status(support)
+        payment = Payment.objects.filter(mollie_payment_id=mollie_payment_id).first()
+        return payment and self.update_payment_status(payment)
@@ -0,0 +1,258 @@
+from datetime import date, timedelta
+from unittest import mock
+from decimal import Decimal
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from apps.core.models import Category, Product, RentalAvailability, RentalRecord
+from apps.orders.models import Order, OrderItem
+from .models import Payment, Support
+from .client import PooledClient
+from .services import DEFAULT_PAYMENT_METHODS, MollieService
+
+
+@override_settings(
+    MOLLIE_API_KEY='test_dummykeyforunittests',
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class PaymentStatusTransitionTests(TestCase):
+    """Mollie statuses are applied once, and final statuses stay final."""
+
+    def setUp(self):
+        self.order = Order.objects.create(
+            email='klant@example.com', shipping_first_name='Jan', shipping_last_name='Jansen',
+            shipping_address='Dorpsstraat 1', shipping_city='Utrecht', shipping_postal_code='1234 AB',
+            subtotal=Decimal('25.00'), total=Decimal('25.00')
+        )
+        self.payment = Payment.objects.create(
+            order=self.order, mollie_payment_id='tr_test1', amount=Decimal('25.00')
+        )
+        self.service = MollieService()
+
+    def apply(self, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.service.apply_payment_status(self.payment, status, 'ideal')
+
+    def test_paid_payment_cannot_go_back(self):
+        self.apply('paid')
+        paid_at = Payment.objects.get(pk=self.payment.pk).paid_at
+        self.order.refresh_from_db()
+        order_paid_at = self.order.paid_at
+
+        for status in ('pending', 'open', 'expired', 'paid'):
+            payment = self.apply(status)
+            self.assertEqual(payment.status, 'paid')
+
+        payment = Payment.objects.get(pk=self.payment.pk)
+        self.order.refresh_from_db()
+        self.assertEqual(payment.paid_at, paid_at)
+        self.assertEqual(self.order.paid_at, order_paid_at)
+        self.assertEqual(self.order.status, 'paid')
+
+    def test_confirmation_emails_are_sent_once(self):
+        self.apply('pending')
+        self.apply('paid')
+        self.apply('pending')
+        self.apply('paid')
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_refunded_payment_stays_refunded(self):
+        Payment.objects.filter(pk=self.payment.pk).update(status='refunded')
+        self.assertEqual(self.apply('paid').status, 'refunded')
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_open_payment_moves_forward(self):
+        self.assertEqual(self.apply('pending').status, 'pending')
+        self.assertEqual(self.apply('authorized').status, 'authorized')
+        self.assertEqual(self.apply('paid').status, 'paid')
+
+    def test_paid_support_cannot_go_back(self):
+        support = Support.objects.create(amount=Decimal('5.00'), mollie_payment_id='tr_test2')
+        self.service.apply_support_status(support, 'paid')
+        paid_at = support.paid_at
+        support = self.service.apply_support_status(support, 'open')
+        self.assertEqual(support.status, 'paid')
+        support = self.service.apply_support_status(support, 'paid')
+        self.assertEqual(support.paid_at, paid_at)
+
+
+
+class UnreachableMethods:
+    def list(self, **params):
+        raise ConnectionError("Mollie is unreachable")
+
+
+@override_settings(MOLLIE_API_KEY='test_dummykeyforunittests')
+class PaymentMethodCatalogueTests(TestCase):
+    """A cold method catalogue that cannot be fetched falls back to iDEAL and is logged."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fetch_failure_is_logged_with_traceback(self):
+        service = MollieService()
+        service.client = type('Client', (), {'methods': UnreachableMethods()})()
+        with self.assertLogs('apps.payments.services', level='ERROR') as logs:
+            methods = service.get_available_payment_methods(amount=Decimal('25.00'))
+        self.assertEqual(methods, DEFAULT_PAYMENT_METHODS)
+        self.assertIn('Error fetching available payment methods from Mollie', logs.output[0])
+        self.assertIn('ConnectionError: Mollie is unreachable', logs.output[0])
+
+@override_settings(
+    MOLLIE_API_KEY='test_dummykeyforunittests',
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class UnpaidOrderReleaseTests(TestCase):
+    """Failed payments leave the order retryable; orders left unpaid are released later."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Tenten')
+        self.tent = Product.objects.create(
+            name='Partytent', description='Tent', price=Decimal('50.00'), category=category, stock=5
+        )
+        self.garland = Product.objects.create(
+            name='Slinger', description='Slinger', price=Decimal('5.00'), category=category,
+            stock=7, selling_type=Product.SELLING_TYPE_SELLING
+        )
+        self.order = Order.objects.create(
+            email='klant@example.com', shipping_first_name='Jan', shipping_last_name='Jansen',
+            shipping_address='Dorpsstraat 1', shipping_city='Utrecht', shipping_postal_code='1234 AB',
+            subtotal=Decimal('115.00'), total=Decimal('115.00')
+        )
+        rental_item = OrderItem.objects.create(
+            order=self.order, product=self.tent, product_name=self.tent.name, quantity=2,
+            price=Decimal('50.00'), total=Decimal('100.00'),
+            rental_start_date=date(2030, 6, 1), rental_end_date=date(2030, 6, 3)
+        )
+        RentalRecord.objects.create(
+            order_item=rental_item, product=self.tent, quantity=2,
+            rental_start_date=date(2030, 6, 1), return_date=date(2030, 6, 3)
+        )
+        OrderItem.objects.create(
+            order=self.order, product=self.garland, product_name=self.garland.name, quantity=3,
+            price=Decimal('5.00'), total=Decimal('15.00')
+        )
+        self.payment = Payment.objects.create(
+            order=self.order, mollie_payment_id='tr_test1', amount=Decimal('115.00')
+        )
+        self.service = MollieService()
+        self.now = timezone.now()
+
+    def reserved(self):
+        return dict(RentalAvailability.objects.filter(product=self.tent).values_list('day', 'reserved'))
+
+    def release(self):
+        return Order.release_abandoned(self.now - timedelta(days=2))
+
+    def age(self, days):
+        Order.objects.filter(pk=self.order.pk).update(created_at=self.now - timedelta(days=days))
+
+    def test_expired_payment_keeps_order_retryable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.apply_payment_status(self.payment, 'expired')
+
+        self.order.refresh_from_db()
+        self.garland.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+        self.assertEqual(self.order.payment_status, 'failed')
+        self.assertEqual(self.garland.stock, 7)
+        self.assertEqual(set(self.reserved().values()), {2})
+
+        response = self.client.get(reverse('orders:failed', args=[self.order.order_number]))
+        self.assertContains(response, reverse('payments:process', args=[self.order.order_number]))
+
+    def test_old_unpaid_order_with_expired_payment_is_released(self):
+        self.service.apply_payment_status(self.payment, 'expired')
+        self.age(3)
+
+        self.assertEqual(self.release(), 1)
+
+        self.order.refresh_from_db()
+        self.garland.refresh_from_db()
+        self.assertEqual(self.order.status, 'cancelled')
+        self.assertEqual(self.garland.stock, 10)
+        self.assertEqual(self.reserved(), {})
+        # The rental never went out, so it does not linger as a returned rental
+        self.assertFalse(RentalRecord.objects.exists())
+        self.assertTrue(OrderItem.objects.filter(order=self.order, product=self.tent).exists())
+
+        # Running again gives nothing back twice
+        self.assertEqual(self.release(), 0)
+        self.assertFalse(self.order.cancel())
+        self.garland.refresh_from_db()
+        self.assertEqual(self.garland.stock, 10)
+
+        # A cancelled order cannot be paid again
+        response = self.client.get(reverse('payments:process', args=[self.order.order_number]))
+        self.assertRedirects(response, reverse('orders:failed', args=[self.order.order_number]))
+        response = self.client.get(reverse('orders:failed', args=[self.order.order_number]))
+        self.assertNotContains(response, reverse('payments:process', args=[self.order.order_number]))
+
+    def test_recent_or_paying_orders_are_kept(self):
+        self.service.apply_payment_status(self.payment, 'expired')
+        self.assertEqual(self.release(), 0)
+
+        self.age(3)
+        retry = Payment.objects.create(order=self.order, mollie_payment_id='tr_test2', amount=Decimal('115.00'))
+        self.assertEqual(self.release(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.apply_payment_status(retry, 'paid')
+        self.assertEqual(self.release(), 0)
+
+        self.order.refresh_from_db()
+        self.garland.refresh_from_db()
+        self.assertEqual(self.order.status, 'paid')
+        self.assertEqual(self.garland.stock, 7)
+        self.assertEqual(set(self.reserved().values()), {2})
+
+
+class UnreachablePayments:
+    def get(self, mollie_payment_id):
+        raise ConnectionError("Mollie is unreachable")
+
+
+@override_settings(MOLLIE_API_KEY='test_dummykeyforunittests')
+class ReconcileStalePaymentsTests(TestCase):
+    """Reconciliation errors are counted and logged per payment."""
+
+    def test_fetch_errors_are_logged(self):
+        order = Order.objects.create(
+            email='klant@example.com', shipping_first_name='Jan', shipping_last_name='Jansen',
+            shipping_address='Dorpsstraat 1', shipping_city='Utrecht', shipping_postal_code='1234 AB',
+            subtotal=Decimal('25.00'), total=Decimal('25.00')
+        )
+        payment = Payment.objects.create(order=order, mollie_payment_id='tr_stale', amount=Decimal('25.00'))
+        Payment.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        service = MollieService()
+        service.client = type('Client', (), {'payments': UnreachablePayments()})()
+
+        with self.assertLogs('apps.payments.services', level='ERROR') as logs:
+            stats = service.reconcile_stale_payments('payment')
+        self.assertEqual(stats, {'checked': 1, 'changed': 0, 'errors': 1})
+        self.assertIn('Error reconciling payment tr_stale', logs.output[0])
+        self.assertIn('ConnectionError', logs.output[0])
+
+
+class PooledClientTests(TestCase):
+    """The Mollie SDK sends its requests through the pooled, retrying session."""
+
+    def setUp(self):
+        self.client = PooledClient(timeout=(2, 10), retries=3, pool_size=7)
+        self.client.set_api_key('test_dummykeyforunittests')
+
+    def test_pooled_adapter_is_mounted(self):
+        adapter = self.client._client.get_adapter('https://api.mollie.com/v2/methods')
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertEqual(adapter.max_retries.total, 3)
+        self.assertEqual(adapter.max_retries.allowed_methods, frozenset({'GET'}))
+
+    def test_requests_use_the_pooled_session(self):
+        session = self.client._client
+        response = mock.Mock(status_code=200)
+        with mock.patch.object(session, 'request', return_value=response) as request:
+            self.assertIs(self.client.perform_http_call('GET', 'methods'), response)
+        self.assertIs(self.client._client, session)
+        self.assertEqual(request.call_args.kwargs['timeout'], (2, 10))
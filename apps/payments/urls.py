@@ -8,5 +8,6 @@ urlpatterns = [
     path('webhook/', views.MollieWebhookView.as_view(), name='webhook'),
     path('webhook-support/', views.MollieSupportWebhookView.as_view(), name='webhook_support'),
     path('return/<str:order_number>/', views.PaymentReturnView.as_view(), name='return'),
+    path('status/<str:order_number>/', views.PaymentStatusView.as_view(), name='status'),
 ]
 
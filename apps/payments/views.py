@@ -1,13 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
 from django.conf import settings
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from apps.orders.models import Order
 from .models import Payment, Support
-from .services import MollieService
+from .services import MollieService, queue_webhook, refresh_returned_status, PENDING_PAYMENT_STATUSES
 
 
 class PaymentProcessView(View):
@@ -19,6 +20,10 @@ class PaymentProcessView(View):
         if order.payment_status == 'paid':
             return redirect('orders:success', order_number=order_number)
         
+        # Cancelled orders no longer hold their stock and cannot be paid
+        if order.status == 'cancelled':
+            return redirect('orders:failed', order_number=order_number)
+        
         # Create Mollie payment
         mollie_service = MollieService()
         
@@ -56,14 +61,12 @@ class MollieWebhookView(View):
         if not payment_id:
             return HttpResponse(status=400)
         
-        try:
-            payment = Payment.objects.get(mollie_payment_id=payment_id)
-        except Payment.DoesNotExist:
+        if not Payment.objects.filter(mollie_payment_id=payment_id).exists():
             return HttpResponse(status=404)
         
-        # Update payment status from Mollie
-        mollie_service = MollieService()
-        mollie_service.update_payment_status(payment)
+        # Acknowledge right away; a Celery task fetches the status from Mollie
+        if not queue_webhook('payment', payment_id):
+            MollieService().process_webhook('payment', payment_id)
         
         return HttpResponse(status=200)
 
@@ -78,37 +81,50 @@ class MollieSupportWebhookView(View):
         if not payment_id:
             return HttpResponse(status=400)
         
-        try:
-            support = Support.objects.get(mollie_payment_id=payment_id)
-        except Support.DoesNotExist:
+        if not Support.objects.filter(mollie_payment_id=payment_id).exists():
             return HttpResponse(status=404)
         
-        # Update support status from Mollie
-        mollie_service = MollieService()
-        mollie_service.update_support_status(support)
+        # Acknowledge right away; a Celery task fetches the status from Mollie
+        if not queue_webhook('support', payment_id):
+            MollieService().process_webhook('support', payment_id)
         
         return HttpResponse(status=200)
 
 
 class PaymentReturnView(View):
     """Handle return from Mollie payment."""
+    template_name = 'payments/payment_pending.html'
     
     def get(self, request, order_number):
         order = get_object_or_404(Order, order_number=order_number)
         
-        # Check latest payment status
+        # The webhook has usually updated the payment by now
         payment = order.payments.order_by('-created_at').first()
         
-        if payment:
-            mollie_service = MollieService()
-            mollie_service.update_payment_status(payment)
-            
-            if payment.status == 'paid':
-                return redirect('orders:success', order_number=order_number)
-        
-        # If not paid, show order status page
-        if order.payment_status == 'paid':
+        if order.payment_status == 'paid' or (payment and payment.status == 'paid'):
             return redirect('orders:success', order_number=order_number)
-        else:
-            return redirect('orders:failed', order_number=order_number)
+        
+        if payment and payment.status in PENDING_PAYMENT_STATUSES:
+            # Wait for the webhook on a page polling PaymentStatusView
+            return render(request, self.template_name, {
+                'order': order,
+                'status_url': reverse('payments:status', kwargs={'order_number': order_number}),
+            })
+        
+        return redirect('orders:failed', order_number=order_number)
 
+
+class PaymentStatusView(View):
+    """Local status of the latest payment of an order, polled by the pending page."""
+    
+    def get(self, request, order_number):
+        order = get_object_or_404(Order, order_number=order_number)
+        payment = order.payments.order_by('-created_at').first()
+        if payment is None:
+            return JsonResponse({'status': None, 'pending': False})
+        
+        payment = refresh_returned_status('payment', payment)
+        return JsonResponse({
+            'status': payment.status,
+            'pending': payment.status in PENDING_PAYMENT_STATUSES,
+        })
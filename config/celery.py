@@ -29,6 +29,31 @@ app.conf.beat_schedule = {
         'task': 'apps.notifications.tasks.process_returned_rentals',
         'schedule': crontab(hour=0, minute=0),
     },
+    # Purge empty and abandoned carts every night at 3:00 AM
+    'purge-stale-carts-daily': {
+        'task': 'apps.notifications.tasks.purge_stale_carts',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    # Correct the denormalized product counts every night at 4:00 AM
+    'reconcile-product-counts-daily': {
+        'task': 'apps.notifications.tasks.reconcile_product_counts',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    # Keep the cached home page sections warm
+    'refresh-home-sections': {
+        'task': 'apps.notifications.tasks.refresh_home_sections',
+        'schedule': crontab(minute='*/10'),
+    },
+    # Keep the cached Mollie payment method catalogue fresh
+    'refresh-payment-methods': {
+        'task': 'apps.notifications.tasks.refresh_payment_methods',
+        'schedule': crontab(minute='*/20'),
+    },
+    # Apply payment statuses of missed Mollie webhooks
+    'reconcile-pending-payments': {
+        'task': 'apps.notifications.tasks.reconcile_pending_payments',
+        'schedule': crontab(minute='*/15'),
+    },
 }
 
 
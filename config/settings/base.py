@@ -181,6 +181,13 @@ RESEND_API_KEY = os.getenv('RESEND_API_KEY', '')
 # Mollie Payment Configuration
 MOLLIE_API_KEY = os.getenv('MOLLIE_API_KEY', '')
 MOLLIE_TEST_MODE = os.getenv('MOLLIE_TEST_MODE', 'True') == 'True'
+# Seconds to wait for a connection to Mollie and for its response
+MOLLIE_CONNECT_TIMEOUT = float(os.getenv('MOLLIE_CONNECT_TIMEOUT', 3.05))
+MOLLIE_READ_TIMEOUT = float(os.getenv('MOLLIE_READ_TIMEOUT', 10))
+# Retries of failed connections and idempotent GETs
+MOLLIE_MAX_RETRIES = int(os.getenv('MOLLIE_MAX_RETRIES', 2))
+# Kept-alive connections to Mollie per process
+MOLLIE_POOL_SIZE = int(os.getenv('MOLLIE_POOL_SIZE', 10))
 
 # Site Settings
 SITE_URL = os.getenv('SITE_URL', 'https://verzendconnect.nl')
@@ -190,6 +197,8 @@ SITE_NAME = os.getenv('SITE_NAME', 'VerzendConnect')
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 30  # 30 days
 CART_SESSION_ID = 'cart'
+EMPTY_CART_MAX_AGE = 60 * 60 * 24  # Empty carts are purged after 1 day
+UNPAID_ORDER_MAX_AGE = 60 * 60 * 24 * 2  # Unpaid orders are cancelled after 2 days, releasing their stock
 
 # Rental Configuration
 # Minimum days from today that a rental can start (e.g., 2 = today + 2 days)